@@ -0,0 +1,207 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('admission')
+
+# 优先级：用户命令优先于后台刷新和预取
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class AdmissionRejected(Exception):
+    """排队已满，请求被拒绝"""
+
+class Ticket:
+    """一个排队中或正在执行的请求"""
+
+    def __init__(self, group_id: str, user_id: str, priority: int = INTERACTIVE):
+        self.group_id = group_id
+        self.user_id = user_id
+        self.priority = priority
+        self.future: Optional[asyncio.Future] = None
+        self.created = time.monotonic()
+        self.admitted = False
+
+class AdmissionScheduler:
+    """浏览器任务的准入调度：限制全局并发，在群组和用户之间轮流放行排队的请求
+
+    用户命令总是先于排队的后台任务放行，后台任务只使用空闲的名额，
+    并且最多占用max_background个名额，给随时到来的用户命令留出余量
+    """
+
+    def __init__(self, max_concurrent: int = 3, max_queue: int = 20, max_background: Optional[int] = None,
+                 max_background_queue: int = 10):
+        """初始化调度器"""
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        if max_background is None:
+            max_background = self.max_concurrent - 1
+        self.max_background = max(1, min(self.max_concurrent, int(max_background)))
+        self.max_background_queue = max(0, int(max_background_queue))
+
+        self.running = 0
+        self.running_background = 0
+        # 每个优先级一条队列：群组 -> 用户 -> 排队的请求，两层都按轮转顺序排列
+        self._lanes: Dict[int, "OrderedDict[str, OrderedDict[str, deque]]"] = {
+            INTERACTIVE: OrderedDict(),
+            BACKGROUND: OrderedDict(),
+        }
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+
+        # 统计信息
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_waiting = 0
+
+    def _enqueue(self, ticket: Ticket):
+        """将请求加入所属优先级、群组和用户的队列"""
+        users = self._lanes[ticket.priority].setdefault(ticket.group_id, OrderedDict())
+        users.setdefault(ticket.user_id, deque()).append(ticket)
+        self._waiting[ticket.priority] += 1
+        self.max_waiting = max(self.max_waiting, self._waiting[INTERACTIVE] + self._waiting[BACKGROUND])
+
+    @staticmethod
+    def _next_from(groups: "OrderedDict[str, OrderedDict[str, deque]]") -> Optional[Ticket]:
+        """按群组、用户轮转取出下一个请求，会修改传入的队列"""
+        if not groups:
+            return None
+        group_id, users = next(iter(groups.items()))
+        user_id, queue = next(iter(users.items()))
+        ticket = queue.popleft()
+        # 刚被服务的用户和群组移到队尾
+        if queue:
+            users.move_to_end(user_id)
+        else:
+            del users[user_id]
+        if users:
+            groups.move_to_end(group_id)
+        else:
+            del groups[group_id]
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """请求前面还有多少个排队的请求"""
+        if ticket.admitted:
+            return 0
+        snapshot = OrderedDict(
+            (g, OrderedDict((u, deque(q)) for u, q in users.items()))
+            for g, users in self._lanes[ticket.priority].items()
+        )
+        # 后台任务前面还有所有排队的用户命令
+        ahead = self._waiting[INTERACTIVE] if ticket.priority == BACKGROUND else 0
+        while True:
+            nxt = self._next_from(snapshot)
+            if nxt is None or nxt is ticket:
+                return ahead
+            ahead += 1
+
+    def _can_start(self, priority: int) -> bool:
+        """是否还有该优先级可以使用的空闲名额"""
+        if self.running >= self.max_concurrent:
+            return False
+        if priority == BACKGROUND:
+            return self.running_background < self.max_background
+        return True
+
+    def enter(self, group_id: str, user_id: str, priority: int = INTERACTIVE) -> Ticket:
+        """申请执行浏览器任务，排队已满时抛出AdmissionRejected"""
+        ticket = Ticket(group_id or "private", user_id, priority)
+        # 同优先级或更高优先级有人排队时不能插队
+        queued_before = self._waiting[INTERACTIVE] + (self._waiting[BACKGROUND] if priority == BACKGROUND else 0)
+        if self._can_start(priority) and not queued_before:
+            self._admit(ticket)
+            return ticket
+        limit = self.max_queue if priority == INTERACTIVE else self.max_background_queue
+        if self._waiting[priority] >= limit:
+            self.rejected += 1
+            logger.warning(f"排队已满（{self._waiting[priority]}），拒绝用户 {user_id} 的请求")
+            raise AdmissionRejected(f"当前查询人数过多，请稍后再试（排队已满 {limit} 个）")
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._enqueue(ticket)
+        return ticket
+
+    def _admit(self, ticket: Ticket):
+        """放行请求"""
+        ticket.admitted = True
+        self.running += 1
+        if ticket.priority == BACKGROUND:
+            self.running_background += 1
+        self.admitted += 1
+        self.total_wait += time.monotonic() - ticket.created
+        if ticket.future is not None and not ticket.future.done():
+            ticket.future.set_result(None)
+
+    async def wait(self, ticket: Ticket):
+        """等待请求被放行"""
+        if ticket.admitted:
+            return
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            self.leave(ticket)
+            raise
+
+    def leave(self, ticket: Ticket):
+        """请求结束或取消，放行下一个排队的请求"""
+        if ticket.admitted:
+            ticket.admitted = False
+            self.running -= 1
+            if ticket.priority == BACKGROUND:
+                self.running_background -= 1
+        else:
+            groups = self._lanes[ticket.priority]
+            users = groups.get(ticket.group_id)
+            queue = users.get(ticket.user_id) if users else None
+            if queue and ticket in queue:
+                queue.remove(ticket)
+                self._waiting[ticket.priority] -= 1
+                if not queue:
+                    del users[ticket.user_id]
+                if not users:
+                    del groups[ticket.group_id]
+            return
+        self._dispatch()
+
+    def _dispatch(self):
+        """放行排队的请求，用户命令优先"""
+        while self.running < self.max_concurrent:
+            if self._waiting[INTERACTIVE]:
+                priority = INTERACTIVE
+            elif self._waiting[BACKGROUND] and self._can_start(BACKGROUND):
+                priority = BACKGROUND
+            else:
+                break
+            nxt = self._next_from(self._lanes[priority])
+            self._waiting[priority] -= 1
+            self._admit(nxt)
+
+    async def run(self, ticket: Ticket, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """等待放行后执行任务，结束后释放名额"""
+        try:
+            await self.wait(ticket)
+            return await fn()
+        finally:
+            self.leave(ticket)
+
+    async def background(self, name: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """以后台优先级执行任务，排队已满时抛出AdmissionRejected"""
+        ticket = self.enter("background", name, BACKGROUND)
+        return await self.run(ticket, fn)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回调度统计"""
+        return {
+            "running": self.running,
+            "running_background": self.running_background,
+            "waiting": self._waiting[INTERACTIVE],
+            "waiting_background": self._waiting[BACKGROUND],
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait * 1000 / self.admitted if self.admitted else 0.0,
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Any
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('browser_pool')
+
+# 浏览器启动参数
+BROWSER_ARGS = [
+    '--disable-web-security',
+    '--disable-features=IsolateOrigins,site-per-process',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+]
+
+class BrowserPool:
+    """插件共享的Chromium浏览器池"""
+
+    def __init__(self, min_browsers: int = 1, max_browsers: int = 2,
+                 max_contexts_per_browser: int = 4, headless: bool = True,
+                 browser_args: Optional[List[str]] = None):
+        """初始化浏览器池"""
+        self.min_browsers = max(0, int(min_browsers))
+        self.max_browsers = max(1, int(max_browsers), self.min_browsers)
+        self.max_contexts_per_browser = max(1, int(max_contexts_per_browser))
+        self.headless = headless
+        self.browser_args = list(browser_args) if browser_args else list(BROWSER_ARGS)
+
+        self._playwright = None
+        self._browsers: List[Any] = []
+        # 每个浏览器当前打开的上下文数量
+        self._context_counts: Dict[Any, int] = {}
+        # 上下文 -> 所属浏览器
+        self._context_owner: Dict[Any, Any] = {}
+
+        self._lock = asyncio.Lock()
+        self._slot_available = asyncio.Condition(self._lock)
+        self._started = False
+        self._closed = False
+
+    async def start(self):
+        """启动playwright并预先拉起最少数量的浏览器"""
+        if self._started:
+            return
+        async with self._lock:
+            if self._started:
+                return
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+
+            # 导入playwright，确保已安装
+            from playwright.async_api import async_playwright
+
+            logger.info(f"启动浏览器池: min={self.min_browsers}, max={self.max_browsers}")
+            self._playwright = await async_playwright().start()
+            for _ in range(self.min_browsers):
+                await self._launch_browser()
+            self._started = True
+
+    async def _launch_browser(self):
+        """启动一个新的浏览器实例（调用方需持有锁）"""
+        logger.debug("浏览器池启动新的浏览器...")
+        browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=self.browser_args
+        )
+        self._browsers.append(browser)
+        self._context_counts[browser] = 0
+        logger.info(f"浏览器池当前浏览器数量: {len(self._browsers)}")
+        return browser
+
+    def _drop_disconnected(self):
+        """移除已经断开连接的浏览器（调用方需持有锁）"""
+        for browser in list(self._browsers):
+            if not browser.is_connected():
+                logger.warning("检测到浏览器已断开连接，从浏览器池中移除")
+                self._browsers.remove(browser)
+                self._context_counts.pop(browser, None)
+                for context, owner in list(self._context_owner.items()):
+                    if owner is browser:
+                        del self._context_owner[context]
+
+    def _pick_browser(self):
+        """选择负载最低且仍有空位的浏览器（调用方需持有锁）"""
+        candidates = [
+            browser for browser in self._browsers
+            if self._context_counts.get(browser, 0) < self.max_contexts_per_browser
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda browser: self._context_counts.get(browser, 0))
+
+    async def acquire_context(self, **context_options):
+        """从浏览器池获取一个全新的BrowserContext"""
+        await self.start()
+
+        async with self._slot_available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("浏览器池已关闭")
+                self._drop_disconnected()
+                browser = self._pick_browser()
+                if browser is None and len(self._browsers) < self.max_browsers:
+                    browser = await self._launch_browser()
+                if browser is not None:
+                    break
+                logger.debug("浏览器池已满，等待空闲位置...")
+                await self._slot_available.wait()
+            # 先占位，避免并发请求超出上限
+            self._context_counts[browser] += 1
+
+        return await self._open_context(browser, context_options)
+
+    async def try_acquire_context(self, **context_options):
+        """只在已启动的浏览器有空位时获取上下文，不启动新浏览器也不等待，没有空位时返回None"""
+        await self.start()
+
+        async with self._slot_available:
+            if self._closed:
+                return None
+            self._drop_disconnected()
+            browser = self._pick_browser()
+            if browser is None:
+                return None
+            self._context_counts[browser] += 1
+
+        return await self._open_context(browser, context_options)
+
+    async def _open_context(self, browser, context_options: Dict[str, Any]):
+        """在已占位的浏览器中创建上下文，失败时归还位置"""
+        try:
+            context = await browser.new_context(**context_options)
+        except Exception:
+            async with self._slot_available:
+                if browser in self._context_counts:
+                    self._context_counts[browser] -= 1
+                self._slot_available.notify()
+            raise
+
+        self._context_owner[context] = browser
+        return context
+
+    async def release_context(self, context):
+        """关闭上下文并归还其在浏览器池中的位置"""
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器上下文时出错: {str(e)}")
+
+        async with self._slot_available:
+            browser = self._context_owner.pop(context, None)
+            if browser is not None and browser in self._context_counts:
+                self._context_counts[browser] = max(0, self._context_counts[browser] - 1)
+            self._slot_available.notify()
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """以上下文管理器的方式使用浏览器上下文，退出时自动归还"""
+        context = await self.acquire_context(**context_options)
+        try:
+            yield context
+        finally:
+            await self.release_context(context)
+
+    def has_free_slot(self) -> bool:
+        """已启动的浏览器中是否还有空位，不计算尚未启动的浏览器"""
+        if self._closed:
+            return False
+        return self._pick_browser() is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回浏览器池当前状态"""
+        return {
+            "browsers": len(self._browsers),
+            "contexts": sum(self._context_counts.values()),
+            "min_browsers": self.min_browsers,
+            "max_browsers": self.max_browsers,
+            "max_contexts_per_browser": self.max_contexts_per_browser,
+        }
+
+    async def close(self):
+        """关闭浏览器池中的所有浏览器"""
+        async with self._slot_available:
+            self._closed = True
+            browsers = list(self._browsers)
+            self._browsers.clear()
+            self._context_counts.clear()
+            self._context_owner.clear()
+            self._slot_available.notify_all()
+
+        for browser in browsers:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"关闭浏览器时出错: {str(e)}")
+
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"停止playwright时出错: {str(e)}")
+            self._playwright = None
+
+        logger.info(f"浏览器池已关闭，共关闭 {len(browsers)} 个浏览器")
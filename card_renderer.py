@@ -0,0 +1,283 @@
+import io
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from .image_workers import ImageWorkerPool
+    from .content_store import ContentStore
+    from .stats_extractor import parse_stat_value
+except ImportError:
+    from image_workers import ImageWorkerPool
+    from content_store import ContentStore
+    from stats_extractor import parse_stat_value
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('card_renderer')
+
+# 常见系统中的中文字体，未配置字体路径时依次尝试
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+)
+
+# 卡片配色
+BACKGROUND = (247, 248, 250)
+HEADER = (31, 41, 55)
+TILE = (255, 255, 255)
+BORDER = (226, 232, 240)
+TEXT = (17, 24, 39)
+MUTED = (107, 114, 128)
+WIN = (22, 163, 74)
+LOSS = (220, 38, 38)
+NEUTRAL = (148, 163, 184)
+
+# 卡片上显示的统计项
+PLAYER_FIELDS = (("rating", "Rating"), ("adr", "ADR"), ("kast", "KAST"), ("kd", "K/D"),
+                 ("kpr", "KPR"), ("headshot", "爆头率"), ("maps", "地图数"))
+TEAM_FIELDS = (("rating", "Rating"), ("win_rate", "胜率"), ("maps", "地图数"), ("kd", "K/D"))
+PERCENT_FIELDS = ("kast", "headshot", "win_rate")
+
+WIDTH = 720
+PADDING = 24
+HEADER_HEIGHT = 84
+TILE_HEIGHT = 76
+TILE_COLUMNS = 4
+LINE_HEIGHT = 34
+ROW_HEIGHT = 60
+
+class CardRenderer:
+    """根据提取的结构化数据在本地绘制选手、战队和比赛结果卡片，不需要浏览器截图"""
+
+    def __init__(self, image_workers: Optional[ImageWorkerPool] = None,
+                 content_store: Optional[ContentStore] = None, font_path: str = ""):
+        """初始化卡片渲染器"""
+        self.image_workers = image_workers or ImageWorkerPool()
+        self.directory = os.path.join(os.path.dirname(__file__), "screenshots")
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+        # 卡片按内容哈希命名，数据相同时只保留一份
+        self.content_store = content_store or ContentStore(self.directory)
+        self.font_path = font_path or next((p for p in FONT_CANDIDATES if os.path.exists(p)), "")
+        # 没有能显示中文的字体时不绘制卡片，由调用方改用文字或截图
+        self.enabled = self._supports_cjk(self.font_path)
+        if not self.enabled:
+            logger.warning(f"未找到可显示中文的字体（{self.font_path or '未配置'}），卡片模式将改用文字回复，请在配置中指定字体路径")
+
+        # 各字号的字体只加载一次，字体对象不能在多个线程中同时使用
+        self._fonts: Dict[int, ImageFont.ImageFont] = {}
+        self._font_lock = threading.Lock()
+
+        # 统计信息
+        self.rendered = 0
+        self.total_ms = 0.0
+
+    @staticmethod
+    def _supports_cjk(font_path: str) -> bool:
+        """字体能否显示中文：中文字符的字形与缺字时显示的方框不同即可"""
+        if not font_path:
+            return False
+        try:
+            font = ImageFont.truetype(font_path, 24)
+            glyph = font.getmask("中")
+            return glyph.getbbox() is not None and bytes(glyph) != bytes(font.getmask("\uffff"))
+        except Exception as e:
+            logger.warning(f"加载字体失败: {font_path}: {str(e)}")
+            return False
+
+    def _font(self, size: int) -> ImageFont.ImageFont:
+        """返回指定字号的字体，加载后缓存"""
+        font = self._fonts.get(size)
+        if font is None:
+            font = ImageFont.truetype(self.font_path, size)
+            self._fonts[size] = font
+        return font
+
+    @staticmethod
+    def _fit(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont, max_width: float) -> str:
+        """文字超出宽度时截断并加省略号"""
+        if draw.textlength(text, font=font) <= max_width:
+            return text
+        while text and draw.textlength(text + "…", font=font) > max_width:
+            text = text[:-1]
+        return text + "…"
+
+    @staticmethod
+    def _value_text(field: str, value: float) -> str:
+        """格式化统计数值"""
+        return f"{value:g}%" if field in PERCENT_FIELDS else f"{value:g}"
+
+    def _header(self, draw: ImageDraw.ImageDraw, title: str, subtitle: str):
+        """绘制标题栏"""
+        draw.rectangle((0, 0, WIDTH, HEADER_HEIGHT), fill=HEADER)
+        draw.text((PADDING, 14), self._fit(draw, title, self._font(30), WIDTH - 2 * PADDING),
+                  font=self._font(30), fill=(255, 255, 255))
+        draw.text((PADDING, 54), subtitle, font=self._font(16), fill=(203, 213, 225))
+
+    def _tiles(self, draw: ImageDraw.ImageDraw, top: int, items: List[Tuple[str, str]]) -> int:
+        """绘制统计数值方块，返回下方的起始高度"""
+        gap = 12
+        tile_width = (WIDTH - 2 * PADDING - gap * (TILE_COLUMNS - 1)) / TILE_COLUMNS
+        for i, (label, value) in enumerate(items):
+            row, col = divmod(i, TILE_COLUMNS)
+            x = PADDING + col * (tile_width + gap)
+            y = top + row * (TILE_HEIGHT + gap)
+            draw.rounded_rectangle((x, y, x + tile_width, y + TILE_HEIGHT), radius=8, fill=TILE, outline=BORDER)
+            draw.text((x + 14, y + 10), self._fit(draw, label, self._font(15), tile_width - 28),
+                      font=self._font(15), fill=MUTED)
+            draw.text((x + 14, y + 32), self._fit(draw, value, self._font(28), tile_width - 28),
+                      font=self._font(28), fill=TEXT)
+        rows = (len(items) + TILE_COLUMNS - 1) // TILE_COLUMNS
+        return top + rows * (TILE_HEIGHT + gap)
+
+    def _form(self, draw: ImageDraw.ImageDraw, top: int, form: List[Dict[str, Any]]) -> int:
+        """绘制近期战绩列表，返回下方的起始高度"""
+        draw.text((PADDING, top), "近期比赛", font=self._font(18), fill=TEXT)
+        y = top + LINE_HEIGHT
+        for item in form:
+            result = (item.get("result") or "").strip()
+            color = WIN if result.upper() in ("W", "胜") else LOSS if result.upper() in ("L", "负") else NEUTRAL
+            draw.rounded_rectangle((PADDING, y + 4, PADDING + 36, y + 28), radius=6, fill=color)
+            badge = result[:2] or "-"
+            badge_width = draw.textlength(badge, font=self._font(15))
+            draw.text((PADDING + 18 - badge_width / 2, y + 6), badge, font=self._font(15), fill=(255, 255, 255))
+            draw.text((PADDING + 48, y + 4), self._fit(draw, item.get("text", ""), self._font(17), WIDTH - 2 * PADDING - 48),
+                      font=self._font(17), fill=TEXT)
+            y += LINE_HEIGHT
+        return y
+
+    def _stat_items(self, data: Dict[str, Any], fields) -> List[Tuple[str, str]]:
+        """选出卡片上显示的统计项，没有识别出常用项时使用页面上的原始统计项"""
+        items = [(label, self._value_text(field, data[field])) for field, label in fields if data.get(field) is not None]
+        if not items:
+            items = [(label, f"{value:g}") for label, value in list(data.get("stats", {}).items())[:8]]
+        return items
+
+    def _entity_card(self, data: Dict[str, Any], subtitle: str, fields, form_limit: int = 5) -> Image.Image:
+        """绘制选手或战队卡片"""
+        items = self._stat_items(data, fields)
+        form = data.get("recent_form", [])[:form_limit]
+        roster = [player["name"] for player in data.get("roster", []) if player.get("name")]
+
+        height = HEADER_HEIGHT + PADDING
+        height += ((len(items) + TILE_COLUMNS - 1) // TILE_COLUMNS) * (TILE_HEIGHT + 12)
+        if roster:
+            height += LINE_HEIGHT + 8
+        if form:
+            height += LINE_HEIGHT * (len(form) + 1) + 8
+        height += 40
+
+        image = Image.new("RGB", (WIDTH, height), BACKGROUND)
+        draw = ImageDraw.Draw(image)
+        self._header(draw, data.get("name", ""), subtitle)
+
+        y = HEADER_HEIGHT + PADDING
+        if roster:
+            text = self._fit(draw, "队员: " + " / ".join(roster), self._font(18), WIDTH - 2 * PADDING)
+            draw.text((PADDING, y), text, font=self._font(18), fill=TEXT)
+            y += LINE_HEIGHT + 8
+        y = self._tiles(draw, y, items)
+        if form:
+            y = self._form(draw, y + 8, form)
+        draw.text((PADDING, height - 30), "数据来源于5eplay.com", font=self._font(14), fill=MUTED)
+        return image
+
+    def _results_card(self, results: List[Dict[str, Any]], subtitle: str) -> Image.Image:
+        """绘制比赛结果卡片"""
+        height = HEADER_HEIGHT + PADDING + len(results) * ROW_HEIGHT + 40
+        image = Image.new("RGB", (WIDTH, height), BACKGROUND)
+        draw = ImageDraw.Draw(image)
+        self._header(draw, "最近的CS:GO比赛结果", subtitle)
+
+        center = WIDTH / 2
+        team_width = center - PADDING - 150
+        y = HEADER_HEIGHT + PADDING
+        for i, match in enumerate(results, 1):
+            draw.rounded_rectangle((PADDING, y, WIDTH - PADDING, y + ROW_HEIGHT - 8), radius=8, fill=TILE, outline=BORDER)
+            draw.text((PADDING + 12, y + 6), f"#{match.get('index', i)}", font=self._font(16), fill=MUTED)
+            draw.text((PADDING + 12, y + 28), self._fit(draw, match.get("time", ""), self._font(13), 110),
+                      font=self._font(13), fill=MUTED)
+
+            score1 = parse_stat_value(str(match.get("score1", "")))
+            score2 = parse_stat_value(str(match.get("score2", "")))
+            color1 = color2 = TEXT
+            if score1 is not None and score2 is not None and score1 != score2:
+                color1, color2 = (WIN, LOSS) if score1 > score2 else (LOSS, WIN)
+
+            team1 = self._fit(draw, match.get("team1", ""), self._font(19), team_width)
+            draw.text((center - 56 - draw.textlength(team1, font=self._font(19)), y + 14), team1,
+                      font=self._font(19), fill=TEXT)
+            score = f"{match.get('score1', '?')} : {match.get('score2', '?')}"
+            score_width = draw.textlength(score, font=self._font(22))
+            left = center - score_width / 2
+            draw.text((left, y + 11), str(match.get("score1", "?")), font=self._font(22), fill=color1)
+            right_text = str(match.get("score2", "?"))
+            draw.text((left + score_width - draw.textlength(right_text, font=self._font(22)), y + 11), right_text,
+                      font=self._font(22), fill=color2)
+            draw.text((center - draw.textlength(":", font=self._font(22)) / 2, y + 11), ":",
+                      font=self._font(22), fill=MUTED)
+            draw.text((center + 56, y + 14), self._fit(draw, match.get("team2", ""), self._font(19), team_width),
+                      font=self._font(19), fill=TEXT)
+            y += ROW_HEIGHT
+        draw.text((PADDING, height - 30), "数据来源于5eplay.com", font=self._font(14), fill=MUTED)
+        return image
+
+    def _draw_to_file(self, draw_fn: Callable[..., Image.Image], args: tuple, path: str) -> str:
+        """绘制卡片并保存为调色板PNG，在图片线程池中执行"""
+        start = time.monotonic()
+        with self._font_lock:
+            image = draw_fn(*args)
+        # 卡片颜色很少，转换为调色板图片后文件更小
+        buffer = io.BytesIO()
+        image.quantize(colors=64).save(buffer, "PNG", optimize=True)
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+        elapsed = (time.monotonic() - start) * 1000
+        self.rendered += 1
+        self.total_ms += elapsed
+        logger.info(f"卡片绘制完成: {path} ({len(buffer.getvalue())} 字节, {elapsed:.1f} ms)")
+        return path
+
+    async def _render(self, prefix: str, draw_fn: Callable[..., Image.Image], *args) -> Optional[str]:
+        """绘制卡片并按内容保存，没有中文字体或绘制失败时返回None"""
+        if not self.enabled:
+            return None
+        path = os.path.join(self.directory, f"{prefix}_{time.time_ns()}.png")
+        try:
+            await self.image_workers.run(self._draw_to_file, draw_fn, args, path)
+        except Exception as e:
+            logger.error(f"绘制卡片失败: {str(e)}", exc_info=True)
+            return None
+        return await self.content_store.adopt(path, prefix)
+
+    async def render_player(self, data: Dict[str, Any]) -> Optional[str]:
+        """绘制选手数据卡片"""
+        return await self._render(f"player_card_{data.get('id', '')}", self._entity_card, data, "选手数据", PLAYER_FIELDS)
+
+    async def render_team(self, data: Dict[str, Any]) -> Optional[str]:
+        """绘制战队数据卡片"""
+        return await self._render(f"team_card_{data.get('id', '')}", self._entity_card, data, "战队数据", TEAM_FIELDS)
+
+    async def render_match_results(self, results: List[Dict[str, Any]], subtitle: str = "") -> Optional[str]:
+        """绘制比赛结果卡片"""
+        return await self._render("results_card", self._results_card, results, subtitle)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回绘制统计"""
+        return {
+            "rendered": self.rendered,
+            "avg_ms": self.total_ms / self.rendered if self.rendered else 0.0,
+            "font": self.font_path if self.enabled else "disabled",
+        }
@@ -0,0 +1,90 @@
+import os
+import glob
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('content_store')
+
+class ContentStore:
+    """按内容哈希命名截图文件，内容相同的截图只保留一份"""
+
+    def __init__(self, directory: str, hold: int = 600):
+        """初始化"""
+        self.directory = directory
+        # 最近返回的文件可能仍在发送或被复用，这段时间内不允许清理
+        self.hold = hold
+        self._recent: Dict[str, float] = {}
+
+        # 统计信息
+        self.stored = 0
+        self.deduplicated = 0
+        self.saved_bytes = 0
+
+    @staticmethod
+    def digest(path: str) -> str:
+        """计算文件内容的哈希值"""
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    async def adopt(self, path: str, prefix: str) -> str:
+        """将新生成的截图改为按内容命名，已有相同内容的文件时删除新文件并返回已有文件
+
+        计算哈希和改名在线程池中执行，不阻塞事件循环
+        """
+        target = await asyncio.get_running_loop().run_in_executor(None, self._adopt, path, prefix)
+        self._remember(target)
+        return target
+
+    def _adopt(self, path: str, prefix: str) -> str:
+        """按内容命名截图，在线程池中执行"""
+        try:
+            ext = os.path.splitext(path)[1]
+            target = os.path.join(self.directory, f"{prefix}_{self.digest(path)[:24]}{ext}")
+            if os.path.abspath(target) == os.path.abspath(path):
+                return path
+
+            if os.path.exists(target):
+                size = os.path.getsize(path)
+                os.remove(path)
+                self.deduplicated += 1
+                self.saved_bytes += size
+                # 更新修改时间，避免复用的文件被清理任务当作旧文件，转换后的副本一起更新，不需要重新转换
+                now = time.time()
+                for p in glob.glob(f"{os.path.splitext(target)[0]}.*"):
+                    os.utime(p, (now, now))
+                logger.info(f"截图内容未变化，复用已有文件: {target}")
+            else:
+                os.replace(path, target)
+                self.stored += 1
+            return target
+        except OSError as e:
+            logger.warning(f"按内容保存截图失败，使用原文件: {str(e)}")
+            return path
+
+    def _remember(self, path: str):
+        """记录最近返回的文件，顺带移除超过保留时间的记录，在事件循环中调用"""
+        now = time.time()
+        self._recent.pop(path, None)
+        self._recent[path] = now
+        while self._recent:
+            oldest, when = next(iter(self._recent.items()))
+            if now - when < self.hold:
+                break
+            del self._recent[oldest]
+
+    def paths(self) -> List[str]:
+        """返回最近返回过的文件路径，清理任务在线程池中调用"""
+        now = time.time()
+        return [path for path, when in list(self._recent.items()) if now - when < self.hold]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回去重统计"""
+        return {"stored": self.stored, "deduplicated": self.deduplicated, "saved_bytes": self.saved_bytes}
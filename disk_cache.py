@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('disk_cache')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key, kind)
+)
+"""
+
+class DiskCache:
+    """插件重载后仍然有效的本地结果缓存
+
+    SQLite只保存元数据，截图和提取出的JSON按内容哈希保存为文件，相同内容只存一份。
+    数据库在第一次使用时才打开，打开时顺带清理过期记录和无人引用的文件
+    """
+
+    def __init__(self, directory: str, enabled: bool = True, default_ttl: int = 3600,
+                 max_bytes: int = 300 * 1024 * 1024):
+        """初始化磁盘缓存"""
+        self.directory = directory
+        self.enabled = enabled
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, "blobs")
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _blob_path(self, digest: str, ext: str) -> str:
+        """内容哈希对应的文件路径"""
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.{ext}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时打开数据库，调用方需持有锁"""
+        if self._conn is None:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "cache.db"), check_same_thread=False)
+            self._conn.execute(SCHEMA)
+            self._conn.commit()
+            removed = self._purge()
+            count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            logger.info(f"已加载磁盘缓存: {count} 条记录，清理了 {removed} 个过期文件")
+        return self._conn
+
+    def _purge(self) -> int:
+        """删除过期记录、超出容量的最旧记录和无人引用的文件，调用方需持有锁"""
+        conn = self._conn
+        conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+
+        # 超出容量时从最旧的记录开始删除
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            for namespace, key, kind, size in conn.execute(
+                    "SELECT namespace, key, kind, size FROM entries ORDER BY created").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ? AND kind = ?", (namespace, key, kind))
+                total -= size
+        conn.commit()
+
+        referenced = {self._blob_path(digest, ext) for digest, ext in conn.execute("SELECT digest, ext FROM entries")}
+        removed = 0
+        for root, _, files in os.walk(self.blob_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if path not in referenced:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except OSError as e:
+                        logger.warning(f"删除缓存文件失败: {path}: {str(e)}")
+        return removed
+
+    def _write_blob(self, data: bytes, ext: str) -> str:
+        """按内容哈希写入文件，已存在时跳过"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def _put(self, namespace: str, key: str, kind: str, data: bytes, ext: str, ttl: Optional[float]):
+        """写入一条记录，在线程池中执行"""
+        with self._lock:
+            conn = self._connect()
+            digest = self._write_blob(data, ext)
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, kind, digest, ext, len(data), now, now + (self.default_ttl if ttl is None else ttl))
+            )
+            conn.commit()
+            self.writes += 1
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                self._purge()
+
+    def _get(self, namespace: str, key: str, kind: str) -> Optional[Dict[str, Any]]:
+        """读取一条未过期的记录，在线程池中执行"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT digest, ext, created, expires FROM entries WHERE namespace = ? AND key = ? AND kind = ?",
+                (namespace, key, kind)
+            ).fetchone()
+        if row is None or row[3] <= time.time():
+            self.misses += 1
+            return None
+        path = self._blob_path(row[0], row[1])
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"path": path, "created": row[2], "expires": row[3]}
+
+    async def _call(self, fn, *args) -> Any:
+        """在线程池中执行数据库和文件操作，出错时只记录日志"""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+        except Exception as e:
+            logger.error(f"磁盘缓存操作失败: {str(e)}")
+            return None
+
+    async def put_json(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """缓存提取出的数据"""
+        if not self.enabled:
+            return
+        data = json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        await self._call(self._put, namespace, key, "json", data, "json", ttl)
+
+    async def get_json(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的数据，返回包含value和created的字典"""
+        if not self.enabled:
+            return None
+
+        def load():
+            entry = self._get(namespace, key, "json")
+            if entry is None:
+                return None
+            with open(entry["path"], "r", encoding="utf-8") as f:
+                entry["value"] = json.load(f)
+            return entry
+
+        return await self._call(load)
+
+    async def put_file(self, namespace: str, key: str, path: str, ttl: Optional[float] = None):
+        """缓存截图文件"""
+        if not self.enabled:
+            return
+
+        def store():
+            with open(path, "rb") as f:
+                data = f.read()
+            ext = os.path.splitext(path)[1].lstrip(".").lower() or "bin"
+            self._put(namespace, key, "file", data, ext, ttl)
+
+        await self._call(store)
+
+    async def restore_file(self, namespace: str, key: str, target: str) -> Optional[Dict[str, Any]]:
+        """将缓存的截图复制到target，返回包含path和created的字典"""
+        if not self.enabled:
+            return None
+
+        def restore():
+            entry = self._get(namespace, key, "file")
+            if entry is None:
+                return None
+            shutil.copyfile(entry["path"], target)
+            entry["path"] = target
+            return entry
+
+        return await self._call(restore)
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
@@ -0,0 +1,202 @@
+import time
+import heapq
+import random
+import logging
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Set, Tuple, Any
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('fuzzy_index')
+
+def trigrams(text: str, pad: bool = True) -> Set[str]:
+    """生成字符三元组，补齐首尾以便短字符串也能匹配"""
+    if pad:
+        text = f"\x02\x02{text}\x03"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """字符三元组倒排索引，先筛选候选再计算相似度，再用相似度上界检查其余记录，结果与逐条比较一致"""
+
+    def __init__(self, entries: List[Any], match_no_space: bool = False, candidates: int = 200):
+        """由名称记录建立索引，记录需提供lower和no_space属性"""
+        self.entries = entries
+        # 是否同时按去空格的名称匹配（战队搜索使用）
+        self.match_no_space = match_no_space
+        # 计算相似度的候选数量
+        self.candidates = candidates
+
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._gram_counts: List[int] = []
+        for i, entry in enumerate(entries):
+            grams = trigrams(self._index_key(entry))
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(i)
+        self._postings = dict(self._postings)
+
+        # 字符倒排表（字符 -> [(记录, 出现次数)]），用于计算相似度上界
+        self._char_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, entry in enumerate(entries):
+            for char, count in Counter(entry.lower).items():
+                self._char_postings[char].append((i, count))
+        self._char_postings = dict(self._char_postings)
+
+    def _index_key(self, entry) -> str:
+        """建立索引使用的名称形式"""
+        return entry.no_space if self.match_no_space else entry.lower
+
+    def _substring_hits(self, key: str) -> Iterable[int]:
+        """找出名称中包含查询的记录"""
+        if len(key) < 3:
+            return (i for i, entry in enumerate(self.entries) if key in self._index_key(entry))
+        postings = [self._postings.get(gram) for gram in trigrams(key, pad=False)]
+        if not all(postings):
+            return []
+        postings.sort(key=len)
+        hits = set(postings[0])
+        for posting in postings[1:]:
+            hits.intersection_update(posting)
+        return (i for i in hits if key in self._index_key(self.entries[i]))
+
+    def _score(self, query: str, query_no_space: str, entry) -> float:
+        """计算相似度，与原有的逐条比较规则一致"""
+        if query in entry.lower:
+            return 0.9
+        if not self.match_no_space:
+            return SequenceMatcher(None, query, entry.lower).ratio()
+        if query_no_space in entry.no_space:
+            return 0.85
+        score_with_space = SequenceMatcher(None, query, entry.lower).ratio()
+        score_no_space = SequenceMatcher(None, query_no_space, entry.no_space).ratio()
+        return max(score_with_space, score_no_space)
+
+    def _upper_bounds(self, query: str, query_no_space: str) -> Dict[int, float]:
+        """与查询有共同字符的记录的相似度上界（即SequenceMatcher.quick_ratio），没有共同字符的记录相似度为0"""
+        common: Dict[int, int] = defaultdict(int)
+        common_spaces: Dict[int, int] = {}
+        for char, n in Counter(query).items():
+            for i, count in self._char_postings.get(char, ()):
+                if char == " ":
+                    common_spaces[i] = min(n, count)
+                else:
+                    common[i] += min(n, count)
+
+        bounds: Dict[int, float] = {}
+        for i in set(common) | set(common_spaces):
+            entry = self.entries[i]
+            bound = 2.0 * (common.get(i, 0) + common_spaces.get(i, 0)) / (len(query) + len(entry.lower))
+            if self.match_no_space and common.get(i):
+                bound = max(bound, 2.0 * common[i] / (len(query_no_space) + len(entry.no_space)))
+            bounds[i] = bound
+        return bounds
+
+    def search(self, query: str, limit: int = 10, threshold: float = 0.3) -> List[Tuple[Any, float]]:
+        """返回按相似度降序排列的(记录, 分数)列表"""
+        query = query.lower()
+        query_no_space = query.replace(" ", "")
+        key = query_no_space if self.match_no_space else query
+
+        scores: Dict[int, float] = {}
+        # 子串匹配分数固定，全部找出
+        for i in self._substring_hits(key):
+            scores[i] = self._score(query, query_no_space, self.entries[i])
+
+        # 按共有三元组的比例选出候选，只对候选计算SequenceMatcher
+        grams = trigrams(key)
+        overlap: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                overlap[i] += 1
+        ranked = sorted(
+            (i for i in overlap if i not in scores),
+            key=lambda i: (-2 * overlap[i] / (len(grams) + self._gram_counts[i]), i)
+        )
+        for i in ranked[:self.candidates]:
+            scores[i] = self._score(query, query_no_space, self.entries[i])
+
+        # 完整性检查：其余记录先用上界排除，上界达到当前第limit名分数的才计算相似度，结果与逐条比较一致
+        top = heapq.nlargest(limit, (s for s in scores.values() if s > threshold))
+        top.sort()
+        bounds = sorted(
+            (-bound, i) for i, bound in self._upper_bounds(query, query_no_space).items()
+            if i not in scores and bound > threshold and (len(top) < limit or bound >= top[0])
+        )
+        for neg_bound, i in bounds:
+            if len(top) >= limit and -neg_bound < top[0]:
+                break
+            score = self._score(query, query_no_space, self.entries[i])
+            scores[i] = score
+            if score > threshold:
+                if len(top) < limit:
+                    heapq.heappush(top, score)
+                elif score > top[0]:
+                    heapq.heapreplace(top, score)
+
+        results = sorted(((i, s) for i, s in scores.items() if s > threshold), key=lambda x: (-x[1], x[0]))
+        return [(self.entries[i], score) for i, score in results[:limit]]
+
+def _typo(name: str, rng: random.Random) -> str:
+    """生成带拼写错误的查询"""
+    if len(name) < 3:
+        return name
+    i = rng.randrange(len(name))
+    op = rng.choice(("delete", "replace", "swap", "prefix"))
+    if op == "delete":
+        return name[:i] + name[i + 1:]
+    if op == "replace":
+        return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+    if op == "swap" and i < len(name) - 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:max(3, len(name) // 2)]
+
+def compare_recall(legacy: Callable[[str], List[tuple]], fast: Callable[[str], List[tuple]],
+                   queries: List[str]) -> Dict[str, float]:
+    """比较新旧实现的前10个结果，返回召回率和耗时"""
+    recall_sum = 0.0
+    top1 = 0
+    exact = 0
+    legacy_time = fast_time = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        expected = legacy(query)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = fast(query)
+        fast_time += time.perf_counter() - start
+
+        expected_ids = {item[:-1] for item in expected}
+        actual_ids = {item[:-1] for item in actual}
+        recall_sum += len(expected_ids & actual_ids) / len(expected_ids) if expected_ids else 1.0
+        top1 += expected[:1] == actual[:1]
+        exact += expected == actual
+    count = len(queries) or 1
+    return {
+        "queries": len(queries),
+        "recall": recall_sum / count,
+        "top1": top1 / count,
+        "identical": exact / count,
+        "legacy_ms": legacy_time * 1000 / count,
+        "fast_ms": fast_time * 1000 / count,
+    }
+
+if __name__ == "__main__":
+    # 用players.txt和teams.txt对比新旧模糊搜索的结果
+    import asyncio
+    from player_search import PlayerSearcher
+    from team_search import TeamSearcher
+
+    async def main():
+        rng = random.Random(5)
+        for searcher, loader in ((PlayerSearcher(), "load_player_data"), (TeamSearcher(), "load_team_data")):
+            snapshot = await getattr(searcher, loader)()
+            plain = dict(snapshot)
+            names = [entry.name for entry in rng.sample(snapshot.entries, min(200, len(snapshot.entries)))]
+            queries = [_typo(name.lower(), rng) for name in names]
+            report = compare_recall(lambda q: searcher.fuzzy_match(q, plain),
+                                    lambda q: searcher.fuzzy_match(q, snapshot), queries)
+            print(f"{type(searcher).__name__}: {report}")
+
+    asyncio.run(main())
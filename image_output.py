@@ -0,0 +1,100 @@
+import io
+import os
+import logging
+from typing import Dict, Optional
+
+from PIL import Image
+
+try:
+    from .image_workers import ImageWorkerPool
+except ImportError:
+    from image_workers import ImageWorkerPool
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('image_output')
+
+# 支持的输出格式及文件扩展名
+OUTPUT_FORMATS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+
+class ImageOutput:
+    """发送前的图片后处理：转换格式、缩小宽度并压缩到平台的大小限制内"""
+
+    def __init__(self, image_workers: Optional[ImageWorkerPool] = None, enabled: bool = True,
+                 image_format: str = "webp", quality: int = 85, min_quality: int = 40,
+                 max_width: int = 1280, quantize: bool = False, max_bytes: int = 2 * 1024 * 1024,
+                 platform_budgets: Optional[Dict[str, int]] = None):
+        """初始化图片输出设置"""
+        self.image_workers = image_workers or ImageWorkerPool()
+        self.enabled = enabled
+        self.image_format = image_format.lower() if image_format.lower() in OUTPUT_FORMATS else "webp"
+        self.quality = max(1, min(100, int(quality)))
+        self.min_quality = max(1, min(self.quality, int(min_quality)))
+        # 0 表示不限制宽度
+        self.max_width = max(0, int(max_width))
+        # 只对PNG输出生效，减少颜色数以缩小文件
+        self.quantize = quantize
+        self.max_bytes = int(max_bytes)
+        # 各平台的大小限制，未配置的平台使用max_bytes
+        self.platform_budgets = dict(platform_budgets or {})
+
+    def budget_for(self, platform: str) -> int:
+        """返回平台对应的文件大小限制"""
+        return int(self.platform_budgets.get(platform, self.max_bytes))
+
+    def _save(self, image: Image.Image, quality: int) -> bytes:
+        """按当前格式编码图片"""
+        buffer = io.BytesIO()
+        if self.image_format == "png":
+            image.save(buffer, "PNG", optimize=True)
+        elif self.image_format == "jpeg":
+            image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(buffer, "WEBP", quality=quality, method=4)
+        return buffer.getvalue()
+
+    def encode(self, source: str, target: str, budget: int) -> str:
+        """转换并压缩图片，在图片线程池中执行"""
+        with Image.open(source) as original:
+            image = original.convert("RGB")
+
+        if self.max_width and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.LANCZOS)
+        if self.image_format == "png" and self.quantize:
+            image = image.quantize(colors=256)
+
+        # 先逐步降低质量，仍然超出限制时再缩小尺寸
+        quality = self.quality
+        data = self._save(image, quality)
+        while len(data) > budget:
+            if self.image_format != "png" and quality > self.min_quality:
+                quality = max(self.min_quality, quality - 10)
+            elif image.width > 400:
+                image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.LANCZOS)
+            else:
+                logger.warning(f"无法将图片压缩到 {budget} 字节以内，当前 {len(data)} 字节")
+                break
+            data = self._save(image, quality)
+
+        with open(target, "wb") as f:
+            f.write(data)
+        logger.info(f"图片已转换: {os.path.getsize(source)} -> {len(data)} 字节 ({self.image_format}, 质量 {quality})")
+        return target
+
+    async def prepare(self, path: str, platform: str = "") -> str:
+        """返回适合在指定平台发送的图片路径，失败时返回原图"""
+        if not self.enabled or not path or not os.path.exists(path):
+            return path
+
+        root, _ = os.path.splitext(path)
+        target = f"{root}.{platform or 'default'}.{OUTPUT_FORMATS[self.image_format]}"
+        # 同一张截图在同一平台上只转换一次
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            return target
+
+        try:
+            return await self.image_workers.run(self.encode, path, target, self.budget_for(platform))
+        except Exception as e:
+            logger.error(f"图片转换失败，发送原图: {str(e)}")
+            return path
@@ -0,0 +1,100 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('image_workers')
+
+class ImageWorkerPool:
+    """在有界线程池中执行图片合成和编码，避免阻塞事件循环"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16):
+        """初始化图片处理线程池"""
+        self.max_workers = max(1, int(max_workers))
+        # 已提交但未完成的任务上限，超过后调用方等待
+        self.max_pending = max(self.max_workers, int(max_pending))
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _ensure_executor(self):
+        """首次使用时创建线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-worker")
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+    def _call(self, fn: Callable, args: tuple, kwargs: dict, submitted_at: float) -> Any:
+        """在工作线程中执行任务并记录耗时"""
+        start = time.monotonic()
+        with self._lock:
+            self.started += 1
+            self.total_wait += start - submitted_at
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.total_run += time.monotonic() - start
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行图片处理函数并等待结果"""
+        self._ensure_executor()
+        async with self._slots:
+            with self._lock:
+                self.submitted += 1
+                running = self.started - self.completed - self.failed
+                # 工作线程都在忙时，新任务需要排队
+                depth = self.submitted - self.started if running >= self.max_workers else 0
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+            if depth:
+                logger.debug(f"图片处理任务排队中，当前队列深度: {depth}")
+
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self._executor, self._call, fn, args, kwargs, time.monotonic())
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.completed += 1
+            return result
+
+    def queue_depth(self) -> int:
+        """等待执行的任务数"""
+        with self._lock:
+            return self.submitted - self.started
+
+    def stats(self) -> Dict[str, Any]:
+        """返回线程池统计"""
+        with self._lock:
+            started = self.started or 1
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.submitted - self.started,
+                "running": self.started - self.completed - self.failed,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": self.total_wait * 1000 / started,
+                "avg_run_ms": self.total_run * 1000 / started,
+            }
+
+    def close(self):
+        """关闭线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
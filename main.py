@@ -1,9 +1,8 @@
 import os
 import logging
 import asyncio
-from typing import Dict, Any
 
-from astrbot.api.event import filter, AstrMessageEvent
+from astrbot.api.event import filter, AstrMessageEvent, MessageChain
 from astrbot.api.star import Context, Star, register
 from astrbot.api.message_components import Plain, Image
 from astrbot.api.all import *
@@ -14,11 +13,47 @@ try:
     from .team_search import TeamSearcher
     from .recent_match import RecentMatchFetcher
     from .match_result import MatchResultFetcher
+    from .browser_pool import BrowserPool
+    from .page_pool import PagePool, PAGE_PROFILES
+    from .page_ready import PageReadiness, JitterPolicy
+    from .resource_blocker import ResourceBlockPolicy
+    from .screenshot_cache import ScreenshotCache
+    from .single_flight import SingleFlight
+    from .stats_extractor import format_player_text, format_team_text
+    from .image_workers import ImageWorkerPool
+    from .image_output import ImageOutput
+    from .screenshot_janitor import ScreenshotJanitor
+    from .session_store import SessionStore
+    from .admission import AdmissionScheduler, AdmissionRejected
+    from .stale_cache import StaleCache, describe_age
+    from .recent_poller import RecentMatchPoller
+    from .disk_cache import DiskCache
+    from .content_store import ContentStore
+    from .card_renderer import CardRenderer
+    from .match_result import DETAIL_HINT
 except ImportError:
     from player_search import PlayerSearcher
     from team_search import TeamSearcher
     from recent_match import RecentMatchFetcher
     from match_result import MatchResultFetcher
+    from browser_pool import BrowserPool
+    from page_pool import PagePool, PAGE_PROFILES
+    from page_ready import PageReadiness, JitterPolicy
+    from resource_blocker import ResourceBlockPolicy
+    from screenshot_cache import ScreenshotCache
+    from single_flight import SingleFlight
+    from stats_extractor import format_player_text, format_team_text
+    from image_workers import ImageWorkerPool
+    from image_output import ImageOutput
+    from screenshot_janitor import ScreenshotJanitor
+    from session_store import SessionStore
+    from admission import AdmissionScheduler, AdmissionRejected
+    from stale_cache import StaleCache, describe_age
+    from recent_poller import RecentMatchPoller
+    from disk_cache import DiskCache
+    from content_store import ContentStore
+    from card_renderer import CardRenderer
+    from match_result import DETAIL_HINT
 
 @register(
     name="astrbot_plugin_5e",  # 插件名称必须与文件名一致
@@ -49,11 +84,193 @@ class FiveEPlayerQuery(Star):
         # 添加处理器到日志记录器
         self.logger.addHandler(console_handler)
         
+        # 创建插件共享的浏览器池
+        pool_config = self.config.get("browser_pool", {})
+        self.browser_pool = BrowserPool(
+            min_browsers=pool_config.get("min_browsers", 1),
+            max_browsers=pool_config.get("max_browsers", 2),
+            max_contexts_per_browser=pool_config.get("max_contexts_per_browser", 4)
+        )
+        # 各类页面的请求拦截规则
+        block_config = self.config.get("resource_blocking", {})
+        block_policies = {}
+        if block_config.get("enabled", True):
+            for profile in PAGE_PROFILES:
+                block_policies[profile] = ResourceBlockPolicy.from_config(profile, block_config.get(profile))
+        
+        # 预热页面池，每种查询类型保持可直接导航的页面
+        self.page_pool = PagePool(
+            browser_pool=self.browser_pool,
+            warm_pages=pool_config.get("warm_pages", 1),
+            block_policies=block_policies
+        )
+        
+        # 页面就绪等待策略，反爬虫随机延迟默认关闭
+        ready_config = self.config.get("readiness", {})
+        self.readiness = PageReadiness(
+            step_timeout=ready_config.get("step_timeout_ms", 10000),
+            quiet_ms=ready_config.get("dom_quiet_ms", 300),
+            jitter=JitterPolicy(
+                enabled=ready_config.get("jitter_enabled", False),
+                min_delay=ready_config.get("jitter_min", 1.0),
+                max_delay=ready_config.get("jitter_max", 2.0)
+            )
+        )
+        
+        # 选手和战队截图缓存
+        cache_config = self.config.get("screenshot_cache", {})
+        self.screenshot_cache = ScreenshotCache(
+            ttls={
+                "player": cache_config.get("player_ttl", 600),
+                "team": cache_config.get("team_ttl", 1800)
+            },
+            max_bytes=cache_config.get("max_size_mb", 200) * 1024 * 1024
+        )
+        
+        # 选手和战队的回复方式：screenshot 截图，text 文字
+        output_config = self.config.get("output", {})
+        self.player_output_mode = output_config.get("player_mode", "screenshot")
+        self.team_output_mode = output_config.get("team_mode", "screenshot")
+        self.results_output_mode = output_config.get("results_mode", "text")
+        
+        # 图片合成和编码使用的线程池
+        worker_config = self.config.get("image_workers", {})
+        self.image_workers = ImageWorkerPool(
+            max_workers=worker_config.get("max_workers", 2),
+            max_pending=worker_config.get("max_pending", 16)
+        )
+        
+        # 发送前的图片格式转换和压缩
+        output_image_config = self.config.get("image_output", {})
+        platform_budgets = {}
+        for item in output_image_config.get("platform_budgets", []):
+            platform, _, size_kb = str(item).partition(":")
+            if platform and size_kb.strip().isdigit():
+                platform_budgets[platform.strip()] = int(size_kb) * 1024
+        self.image_output = ImageOutput(
+            image_workers=self.image_workers,
+            enabled=output_image_config.get("enabled", True),
+            image_format=output_image_config.get("format", "webp"),
+            quality=output_image_config.get("quality", 85),
+            min_quality=output_image_config.get("min_quality", 40),
+            max_width=output_image_config.get("max_width", 1280),
+            quantize=output_image_config.get("quantize", False),
+            max_bytes=output_image_config.get("max_size_kb", 2048) * 1024,
+            platform_budgets=platform_budgets
+        )
+        
+        # 各查询器共享的用户会话存储
+        session_config = self.config.get("sessions", {})
+        self.sessions = SessionStore(max_entries=session_config.get("max_entries", 10000))
+        
+        # 浏览器任务的准入调度，限制同时进行的抓取数量
+        scheduler_config = self.config.get("scheduler", {})
+        self.scheduler = AdmissionScheduler(
+            max_concurrent=scheduler_config.get("max_concurrent", 3),
+            max_queue=scheduler_config.get("max_queue", 20),
+            max_background=scheduler_config.get("max_background", 2),
+            max_background_queue=scheduler_config.get("max_background_queue", 10)
+        )
+        
+        # 最近比赛和比赛结果先返回旧数据，过了软期限在后台刷新
+        stale_config = self.config.get("stale_cache", {})
+        self.stale_cache = StaleCache(
+            soft_ttl=stale_config.get("soft_ttl", 60),
+            hard_ttl=stale_config.get("hard_ttl", 600),
+            scheduler=self.scheduler
+        )
+        
+        # 插件重载后仍然有效的磁盘缓存，四个查询器共用，首次使用时才加载
+        disk_config = self.config.get("disk_cache", {})
+        self.disk_cache = DiskCache(
+            os.path.join(os.path.dirname(__file__), "cache"),
+            enabled=disk_config.get("enabled", True),
+            max_bytes=disk_config.get("max_size_mb", 300) * 1024 * 1024
+        )
+        
+        # 截图按内容哈希命名，四个查询器共用，内容相同的截图只保存一份
+        self.content_store = ContentStore(os.path.join(os.path.dirname(__file__), "screenshots"))
+        
+        # 根据提取的数据在本地绘制卡片，代替浏览器截图
+        self.card_renderer = CardRenderer(
+            image_workers=self.image_workers,
+            content_store=self.content_store,
+            font_path=output_config.get("card_font_path", "")
+        )
+        
+        # 合并各查询器中并发的相同抓取
+        self.single_flight = SingleFlight()
+        
         # 创建PlayerSearcher和TeamSearcher实例
-        self.player_searcher = PlayerSearcher()
-        self.team_searcher = TeamSearcher()
-        self.match_fetcher = RecentMatchFetcher()
-        self.result_fetcher = MatchResultFetcher()
+        self.player_searcher = PlayerSearcher(
+            page_pool=self.page_pool,
+            readiness=self.readiness,
+            screenshot_cache=self.screenshot_cache,
+            single_flight=self.single_flight,
+            sessions=self.sessions,
+            disk_cache=self.disk_cache,
+            content_store=self.content_store
+        )
+        self.team_searcher = TeamSearcher(
+            page_pool=self.page_pool,
+            readiness=self.readiness,
+            screenshot_cache=self.screenshot_cache,
+            single_flight=self.single_flight,
+            sessions=self.sessions,
+            disk_cache=self.disk_cache,
+            content_store=self.content_store
+        )
+        self.match_fetcher = RecentMatchFetcher(
+            page_pool=self.page_pool,
+            readiness=self.readiness,
+            single_flight=self.single_flight,
+            image_workers=self.image_workers,
+            stale_cache=self.stale_cache,
+            disk_cache=self.disk_cache,
+            content_store=self.content_store
+        )
+        self.result_fetcher = MatchResultFetcher(
+            page_pool=self.page_pool,
+            readiness=self.readiness,
+            single_flight=self.single_flight,
+            sessions=self.sessions,
+            stale_cache=self.stale_cache,
+            disk_cache=self.disk_cache,
+            content_store=self.content_store
+        )
+        
+        # 可选的最近比赛快照后台刷新，查询时直接返回缓存的快照
+        poller_config = self.config.get("recent_poller", {})
+        self.recent_poller_enabled = poller_config.get("enabled", False)
+        self.recent_poller = RecentMatchPoller(
+            self.match_fetcher,
+            interval=poller_config.get("interval", 45),
+            idle_after=poller_config.get("idle_minutes", 30) * 60,
+            max_interval=poller_config.get("max_interval", 540),
+            hard_ttl=self.stale_cache.hard_ttl
+        )
+        
+        # 截图目录清理任务，截图缓存、过期缓存中的快照和刚生成的截图、卡片都不会被删除
+        janitor_config = self.config.get("screenshot_janitor", {})
+        self.janitor = ScreenshotJanitor(
+            os.path.join(os.path.dirname(__file__), "screenshots"),
+            max_age=janitor_config.get("max_age_hours", 24) * 3600,
+            max_bytes=janitor_config.get("max_size_mb", 500) * 1024 * 1024,
+            interval=janitor_config.get("interval_minutes", 10) * 60,
+            protected=lambda: self.screenshot_cache.paths() + self.stale_cache.paths() + self.content_store.paths()
+        )
+        
+        # 在后台预先启动浏览器池并预热页面，首次查询无需等待浏览器启动
+        try:
+            asyncio.get_running_loop().create_task(self._start_browser_pool())
+            if janitor_config.get("enabled", True):
+                self.janitor.start()
+            self.sessions.start()
+            if self.recent_poller_enabled:
+                self.recent_poller.start()
+        except RuntimeError:
+            # 没有运行中的事件循环时，浏览器池会在首次使用时启动
+            pass
         
         # 添加截图保存路径
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
@@ -62,6 +279,59 @@ class FiveEPlayerQuery(Star):
             
         self.logger.info("5E数据查询插件初始化完成")
 
+    async def _start_browser_pool(self):
+        """后台启动浏览器池并预热页面"""
+        try:
+            await self.page_pool.warm_up()
+        except Exception as e:
+            self.logger.error(f"启动浏览器池失败: {str(e)}", exc_info=True)
+
+    async def _image_for(self, event: AstrMessageEvent, path: str) -> str:
+        """按发送平台转换图片格式和大小"""
+        try:
+            platform = event.get_platform_name()
+        except Exception:
+            platform = ""
+        return await self.image_output.prepare(path, platform)
+
+    async def _admitted(self, event: AstrMessageEvent, fn):
+        """经过准入调度后执行浏览器任务，需要排队时告知用户前面的请求数"""
+        try:
+            group_id = str(event.get_group_id() or "")
+        except Exception:
+            group_id = ""
+        user_id = str(event.get_sender_id())
+        
+        # 排队已满时直接抛出AdmissionRejected
+        ticket = self.scheduler.enter(group_id, user_id)
+        if not ticket.admitted:
+            ahead = self.scheduler.position(ticket)
+            self.logger.info(f"用户 {user_id} 的请求进入排队，前面还有 {ahead} 个请求")
+            try:
+                await event.send(MessageChain().message(f"⏳ 当前查询较多，您前面还有 {ahead} 个请求，请稍候..."))
+            except Exception as e:
+                self.logger.warning(f"发送排队提示失败: {str(e)}")
+        return await self.scheduler.run(ticket, fn)
+
+    async def terminate(self):
+        """插件卸载时释放浏览器资源"""
+        self.janitor.stop()
+        self.recent_poller.stop()
+        if self.recent_poller_enabled:
+            self.logger.info(f"最近比赛轮询统计: {self.recent_poller.stats()}")
+        self.sessions.stop()
+        self.stale_cache.stop()
+        self.logger.info(f"过期缓存统计: {self.stale_cache.stats()}")
+        self.logger.info(f"会话存储统计: {self.sessions.stats()}")
+        self.logger.info(f"准入调度统计: {self.scheduler.stats()}")
+        await self.page_pool.close()
+        self.logger.info(f"图片线程池统计: {self.image_workers.stats()}")
+        self.image_workers.close()
+        self.logger.info(f"磁盘缓存统计: {self.disk_cache.stats()}")
+        self.logger.info(f"截图去重统计: {self.content_store.stats()}")
+        self.logger.info(f"卡片绘制统计: {self.card_renderer.stats()}")
+        self.disk_cache.close()
+
     @filter.command("5e_help")
     async def show_help(self, event: AstrMessageEvent):
         """显示5E查询插件的帮助信息"""
@@ -120,16 +390,37 @@ class FiveEPlayerQuery(Star):
                 player_id = result.get("player_id")
                 player_name = result.get("player_name")
                 
-                # 获取选手数据
-                self.logger.debug(f"开始获取选手数据: player_id={player_id}, player_name={player_name}")
-                screenshot_path = await self.player_searcher.get_player_stats(player_id, player_name)
+                # 缓存未命中、需要打开页面时才经过准入调度
+                admit = lambda fn: self._admitted(event, fn)
+                data, screenshot_path = None, None
+                
+                # 文字和卡片模式直接提取页面数据，提取失败时改用截图
+                if self.player_output_mode in ("text", "card"):
+                    data = await self.player_searcher.get_player_data(player_id, player_name, admit=admit)
+                    if not data:
+                        self.logger.warning(f"未能提取 {player_name} 的文字数据，改用截图")
+                
+                if not data:
+                    # 获取选手数据
+                    self.logger.debug(f"开始获取选手数据: player_id={player_id}, player_name={player_name}")
+                    screenshot_path = await self.player_searcher.get_player_stats(player_id, player_name, admit=admit)
+                if data:
+                    card_path = await self.card_renderer.render_player(data) if self.player_output_mode == "card" else None
+                    if card_path:
+                        yield event.chain_result([
+                            Plain(text=f"📊 {player_name} 的数据：\n"),
+                            Image(file=await self._image_for(event, card_path))
+                        ])
+                    else:
+                        yield event.plain_result(format_player_text(data))
+                    return
                 
                 if screenshot_path and os.path.exists(screenshot_path):
                     self.logger.info(f"成功获取选手截图: {screenshot_path}")
                     # 发送图片
                     message_chain = [
                         Plain(text=f"📊 {player_name} 的数据：\n"),
-                        Image(file=screenshot_path)
+                        Image(file=await self._image_for(event, screenshot_path))
                     ]
                     yield event.chain_result(message_chain)
                 else:
@@ -139,6 +430,8 @@ class FiveEPlayerQuery(Star):
                 # 其他结果直接回复
                 self.logger.info(f"直接返回结果: {result['message'][:50]}...")
                 yield event.plain_result(result["message"])
+        except AdmissionRejected as e:
+            yield event.plain_result(str(e))
         except Exception as e:
             self.logger.error(f"处理选手查询命令时出错: {str(e)}", exc_info=True)
             yield event.plain_result(f"处理请求时出错: {str(e)}")
@@ -166,16 +459,37 @@ class FiveEPlayerQuery(Star):
                 team_id = result.get("team_id")
                 team_name = result.get("team_name")
                 
-                # 获取战队数据
-                self.logger.debug(f"开始获取战队数据: team_id={team_id}, team_name={team_name}")
-                screenshot_path = await self.team_searcher.get_team_stats(team_id, team_name)
+                # 缓存未命中、需要打开页面时才经过准入调度
+                admit = lambda fn: self._admitted(event, fn)
+                data, screenshot_path = None, None
+                
+                # 文字和卡片模式直接提取页面数据，提取失败时改用截图
+                if self.team_output_mode in ("text", "card"):
+                    data = await self.team_searcher.get_team_data(team_id, team_name, admit=admit)
+                    if not data:
+                        self.logger.warning(f"未能提取 {team_name} 的文字数据，改用截图")
+                
+                if not data:
+                    # 获取战队数据
+                    self.logger.debug(f"开始获取战队数据: team_id={team_id}, team_name={team_name}")
+                    screenshot_path = await self.team_searcher.get_team_stats(team_id, team_name, admit=admit)
+                if data:
+                    card_path = await self.card_renderer.render_team(data) if self.team_output_mode == "card" else None
+                    if card_path:
+                        yield event.chain_result([
+                            Plain(text=f"📊 {team_name} 的数据：\n"),
+                            Image(file=await self._image_for(event, card_path))
+                        ])
+                    else:
+                        yield event.plain_result(format_team_text(data))
+                    return
                 
                 if screenshot_path and os.path.exists(screenshot_path):
                     self.logger.info(f"成功获取战队截图: {screenshot_path}")
                     # 发送图片
                     message_chain = [
                         Plain(text=f"📊 {team_name} 的数据：\n"),
-                        Image(file=screenshot_path)
+                        Image(file=await self._image_for(event, screenshot_path))
                     ]
                     yield event.chain_result(message_chain)
                 else:
@@ -185,6 +499,8 @@ class FiveEPlayerQuery(Star):
                 # 其他结果直接回复
                 self.logger.info(f"直接返回结果: {result['message'][:50]}...")
                 yield event.plain_result(result["message"])
+        except AdmissionRejected as e:
+            yield event.plain_result(str(e))
         except Exception as e:
             self.logger.error(f"处理战队查询命令时出错: {str(e)}", exc_info=True)
             yield event.plain_result(f"处理请求时出错: {str(e)}")
@@ -193,24 +509,29 @@ class FiveEPlayerQuery(Star):
     async def handle_recent_matches(self, event: AstrMessageEvent):
         """处理最近比赛查询命令"""
         self.logger.info(f"收到最近比赛查询命令")
+        self.recent_poller.touch()
         
         try:
             yield event.plain_result("📊 正在获取最近比赛数据，请稍候...")
             
             # 获取最近比赛数据
-            screenshot_path = await self.match_fetcher.get_recent_matches()
+            screenshot_path, age = await self.match_fetcher.get_recent_matches_cached(
+                admit=lambda fn: self._admitted(event, fn)
+            )
             
             if screenshot_path and os.path.exists(screenshot_path):
                 self.logger.info(f"成功获取最近比赛截图: {screenshot_path}")
                 # 发送图片
                 message_chain = [
-                    Plain(text="📊 最近的CS:GO比赛：\n"),
-                    Image(file=screenshot_path)
+                    Plain(text=f"📊 最近的CS:GO比赛（{describe_age(age)}）：\n"),
+                    Image(file=await self._image_for(event, screenshot_path))
                 ]
                 yield event.chain_result(message_chain)
             else:
                 self.logger.error(f"获取最近比赛数据失败或截图文件不存在")
                 yield event.plain_result("获取最近比赛数据失败，请稍后重试")
+        except AdmissionRejected as e:
+            yield event.plain_result(str(e))
         except Exception as e:
             self.logger.error(f"处理最近比赛查询命令时出错: {str(e)}", exc_info=True)
             yield event.plain_result(f"处理请求时出错: {str(e)}")
@@ -228,14 +549,28 @@ class FiveEPlayerQuery(Star):
             yield event.plain_result("📊 正在获取最近的比赛结果，请稍候...")
             
             # 传递user_id给process_command
-            result = await self.result_fetcher.process_command("比赛结果", user_id)
+            # 只有需要实时抓取时才经过准入调度
+            result = await self.result_fetcher.process_command(
+                "比赛结果", user_id, admit=lambda fn: self._admitted(event, fn)
+            )
             
             if result["success"]:
                 self.logger.info(f"成功获取比赛结果，用户ID: {user_id}")
-                yield event.plain_result(result["message"])
+                card_path = None
+                if self.results_output_mode == "card" and result.get("results"):
+                    card_path = await self.card_renderer.render_match_results(result["results"], describe_age(result.get("age", 0.0)))
+                if card_path:
+                    yield event.chain_result([
+                        Image(file=await self._image_for(event, card_path)),
+                        Plain(text=DETAIL_HINT)
+                    ])
+                else:
+                    yield event.plain_result(result["message"])
             else:
                 self.logger.error(f"获取比赛结果失败: {result['message']}")
                 yield event.plain_result(f"获取比赛结果失败: {result['message']}")
+        except AdmissionRejected as e:
+            yield event.plain_result(str(e))
         except Exception as e:
             self.logger.error(f"处理比赛结果查询命令时出错: {str(e)}", exc_info=True)
             yield event.plain_result(f"处理请求时出错: {str(e)}")
@@ -251,28 +586,17 @@ class FiveEPlayerQuery(Star):
         
         try:
             # 查看会话状态
-            active_sessions = self.result_fetcher.active_browsers.keys()
-            user_session = self.result_fetcher.search_results.get(user_id, "无")
-            
-            self.logger.debug(f"用户 {user_id} 的会话ID: {user_session}")
-            self.logger.debug(f"当前活跃会话IDs: {list(active_sessions)}")
-            self.logger.debug(f"用户的会话是否活跃: {user_session in active_sessions}")
+            user_session = self.sessions.get("match_user", user_id)
             
-            if user_id in self.result_fetcher.search_results:
-                session_id = self.result_fetcher.search_results[user_id]
-                if session_id in self.result_fetcher.active_browsers:
-                    browser_data = self.result_fetcher.active_browsers[session_id]
-                    try:
-                        is_connected = browser_data['browser'].is_connected()
-                        is_page_closed = browser_data['page'].is_closed()
-                        self.logger.debug(f"浏览器连接状态: {is_connected}, 页面是否关闭: {is_page_closed}")
-                    except Exception as e:
-                        self.logger.warning(f"检查浏览器状态时出错: {str(e)}")
+            self.logger.debug(f"用户 {user_id} 的会话ID: {user_session or '无'}")
+            self.logger.debug(f"当前会话存储: {self.sessions.stats()}")
             
             yield event.plain_result("🔍 正在获取比赛详细信息，请稍候...")
             
-            # 获取比赛详情
-            result = await self.result_fetcher.process_command(message, user_id)
+            # 获取比赛详情，会话检查通过后只有打开详情页截图时才经过准入调度
+            result = await self.result_fetcher.process_command(
+                message, user_id, admit=lambda fn: self._admitted(event, fn)
+            )
             
             if result["success"]:
                 self.logger.info(f"成功获取比赛详情")
@@ -289,7 +613,7 @@ class FiveEPlayerQuery(Star):
                     
                     message_chain = [
                         Plain(text=message_text),
-                        Image(file=result["image_path"])
+                        Image(file=await self._image_for(event, result["image_path"]))
                     ]
                     yield event.chain_result(message_chain)
                 else:
@@ -297,6 +621,8 @@ class FiveEPlayerQuery(Star):
             else:
                 self.logger.error(f"获取比赛详情失败: {result['message']}")
                 yield event.plain_result(result["message"])
+        except AdmissionRejected as e:
+            yield event.plain_result(str(e))
         except Exception as e:
             self.logger.error(f"处理比赛详情命令时出错: {str(e)}", exc_info=True)
             yield event.plain_result(f"处理请求时出错: {str(e)}")
@@ -323,7 +649,7 @@ class FiveEPlayerQuery(Star):
             if screenshot_path and os.path.exists(screenshot_path):
                 message_chain = [
                     Plain(text="📊 最近的CS:GO比赛：\n"),
-                    Image(file=screenshot_path)
+                    Image(file=await self._image_for(event, screenshot_path))
                 ]
                 yield event.chain_result(message_chain)
             else:
@@ -351,7 +677,7 @@ class FiveEPlayerQuery(Star):
                 
                 message_chain = [
                     Plain(text=f"📊 比赛详情: {team1} vs {team2}\n"),
-                    Image(file=result["image_path"])
+                    Image(file=await self._image_for(event, result["image_path"]))
                 ]
                 yield event.chain_result(message_chain)
             else:
@@ -1,62 +1,158 @@
 import os
 import asyncio
-import random
 import time
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 import re
 
+try:
+    from .page_pool import PagePool
+    from .page_ready import PageReadiness
+    from .single_flight import SingleFlight
+    from .stale_cache import StaleCache, describe_age
+    from .admission import AdmissionRejected
+    from .session_store import SessionStore
+    from .disk_cache import DiskCache
+    from .content_store import ContentStore
+except ImportError:
+    from page_pool import PagePool
+    from page_ready import PageReadiness
+    from single_flight import SingleFlight
+    from stale_cache import StaleCache, describe_age
+    from admission import AdmissionRejected
+    from session_store import SessionStore
+    from disk_cache import DiskCache
+    from content_store import ContentStore
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('match_result')
 
-# 用户代理列表，用于反爬虫
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-]
+# 比赛结果回复末尾的使用说明
+DETAIL_HINT = "📌 在30秒内发送 '比赛[数字]' 查看对应比赛的详细信息，例如：比赛1"
+
+# 比赛列表的行选择器
+MATCH_ROW_SELECTOR = 'div.match-item-row.cp'
+
+# 比赛详情页地址，列表页、战队和选手页面的链接都不匹配
+MATCH_DETAIL_PATTERN = r'^https?://event\.5eplay\.com/csgo/match(?:es)?/(?:csgo_[a-z]+_)?(\d+)/?(?:[?#].*)?$'
+MATCH_DETAIL_RE = re.compile(MATCH_DETAIL_PATTERN)
+
+# MATCH_LIST_SCRIPT的参数
+MATCH_LIST_ARGS = {"rowSelector": MATCH_ROW_SELECTOR, "detailPattern": MATCH_DETAIL_PATTERN}
+
+# 一次evaluate读取整个比赛列表
+MATCH_LIST_SCRIPT = """
+({rowSelector, detailPattern}) => {
+    const text = el => el ? el.innerText.trim() : '';
+    const detail = new RegExp(detailPattern);
+    return Array.from(document.querySelectorAll(rowSelector)).map((row, i) => {
+        const left = row.querySelector('div.match-item.match-item-left.flex-horizontal.flex-align-center');
+        if (!left) return null;
+        const teams = Array.from(left.querySelectorAll('div.match-team.flex-vertical.flex-align-center div.cp p.ellip')).map(text);
+        const scores = Array.from(left.querySelectorAll('div.all-score-box div.all-score div')).map(text);
+        // 只接受行内指向比赛详情页的链接
+        const anchor = Array.from(row.querySelectorAll('a[href]')).find(a => detail.test(a.href));
+        const dataHref = row.getAttribute('data-href') ? new URL(row.getAttribute('data-href'), location.href).href : '';
+        const link = anchor ? anchor.href : (detail.test(dataHref) ? dataHref : '');
+        const idMatch = link.match(detail);
+        return {
+            row: i,
+            time: text(left.querySelector('div.match-time-star div')),
+            teams: teams,
+            scores: scores,
+            link: link,
+            match_id: row.getAttribute('data-id') || (idMatch ? idMatch[1] : '')
+        };
+    }).filter(item => item);
+}
+"""
+
+def is_match_detail_url(url: Optional[str]) -> bool:
+    """是否为比赛详情页地址"""
+    return bool(url) and MATCH_DETAIL_RE.match(url) is not None
+
+def parse_match_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """将MATCH_LIST_SCRIPT返回的原始行整理为比赛数据"""
+    results = []
+    for item in rows:
+        teams = item['teams']
+        scores = item['scores']
+        if len(teams) < 2:
+            logger.warning(f"第 {item['row'] + 1} 场比赛未能获取完整队伍名称")
+        if len(scores) < 2:
+            logger.warning(f"第 {item['row'] + 1} 场比赛未能获取完整比分")
+        results.append({
+            'index': item['row'] + 1,
+            'row': item['row'],
+            'time': item['time'] or "未知时间",
+            'team1': teams[0] if len(teams) >= 2 else "未知队伍1",
+            'team2': teams[1] if len(teams) >= 2 else "未知队伍2",
+            'score1': scores[0] if len(scores) >= 2 else "?",
+            'score2': scores[1] if len(scores) >= 2 else "?",
+            'match_id': item['match_id'],
+            'link': item['link'],
+            'selector': f"{MATCH_ROW_SELECTOR}:nth-of-type({item['row'] + 1})"
+        })
+    return results
 
 class MatchResultFetcher:
     """CS:GO 比赛结果查询类"""
     
-    def __init__(self):
+    def __init__(self, page_pool: Optional[PagePool] = None,
+                 readiness: Optional[PageReadiness] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 sessions: Optional[SessionStore] = None,
+                 stale_cache: Optional[StaleCache] = None,
+                 disk_cache: Optional[DiskCache] = None,
+                 content_store: Optional[ContentStore] = None):
         """初始化查询器"""
+        # 共享的页面池，未传入时使用独立的页面池
+        self.page_pool = page_pool or PagePool()
+        # 页面就绪等待策略
+        self.readiness = readiness or PageReadiness()
+        # 合并并发的相同抓取
+        self.single_flight = single_flight or SingleFlight()
+        
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir, exist_ok=True)
+        # 截图按内容哈希命名，内容相同的截图只保留一份
+        self.content_store = content_store or ContentStore(self.screenshot_dir)
             
         # 存储用户搜索结果和时间戳
-        self.search_results = {}
-        self.search_timestamps = {}
+        # 用户会话和比赛结果快照都保存在会话存储中，过期后自动清理
+        self.sessions = sessions if sessions is not None else SessionStore()
         self.result_timeout = 30  # 结果有效期（秒）
+        # 比赛结果先返回旧数据再后台刷新
+        self.stale_cache = stale_cache or StaleCache()
+        # 插件重载后仍然有效的比赛结果缓存
+        self.disk_cache = disk_cache or DiskCache(os.path.join(os.path.dirname(__file__), "cache"))
+        
+        # 最新的比赛结果快照，只保存解析后的数据，所有用户共享同一份
+        self.latest_snapshot: Optional[str] = None
         
-        # 存储比赛页面的browser和page，以便进行后续操作
-        self.active_browsers = {}
+        # 比赛到详情页地址的缓存
+        self.match_links: Dict[str, Tuple[str, float]] = {}
+        self.match_link_ttl = 24 * 3600  # 缓存有效期（秒）
+        self.match_link_max = 500  # 最多缓存的地址数
 
     async def get_match_results(self) -> Dict[str, Any]:
         """获取比赛结果数据"""
         logger.info("开始获取比赛结果数据")
         
+        # 并发的比赛结果查询合并为一次抓取
+        key = SingleFlight.make_key("https://event.5eplay.com/csgo/matches", tab="赛果")
+        return await self.single_flight.do(key, self._fetch_match_results)
+    
+    async def _fetch_match_results(self) -> Dict[str, Any]:
+        """打开比赛页面并提取赛果列表"""
         try:
-            # 导入playwright，确保已安装
-            from playwright.async_api import async_playwright
+            # 确保浏览器池已启动，未安装playwright时会抛出ImportError
+            await self.page_pool.start()
             
             # 比赛结果数据
             match_results = []
-            match_elements = []  # 存储匹配到的元素，用于后续点击
-            
-            # 配置浏览器启动参数
-            browser_args = [
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-            logger.debug(f"浏览器启动参数: {browser_args}")
             
             # 重试机制
             max_retries = 3
@@ -67,59 +163,15 @@ class MatchResultFetcher:
                 try:
                     logger.info(f"第 {attempt + 1}/{max_retries} 次尝试获取比赛结果数据")
                     
-                    async with async_playwright() as p:
-                        # 随机选择一个用户代理
-                        user_agent = random.choice(USER_AGENTS)
-                        logger.debug(f"使用的User-Agent: {user_agent}")
-                        
-                        logger.debug("启动浏览器...")
-                        browser = await p.chromium.launch(
-                            headless=True,
-                            args=browser_args
-                        )
-                        
-                        logger.debug("创建浏览器上下文...")
-                        context = await browser.new_context(
-                            viewport={'width': 1280, 'height': 900},
-                            user_agent=user_agent,
-                            ignore_https_errors=True,
-                            accept_downloads=True,
-                            java_script_enabled=True,
-                            bypass_csp=True,
-                            extra_http_headers={
-                                'Accept': '*/*',
-                                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                                'Accept-Encoding': 'gzip, deflate, br',
-                                'Connection': 'keep-alive',
-                            }
-                        )
-                        
-                        logger.debug("创建新页面...")
-                        page = await context.new_page()
-                        
-                        # 添加反爬虫脚本
-                        logger.debug("添加反爬虫脚本...")
-                        await page.add_init_script("""
-                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                            window.localStorage.setItem('CookieConsent', JSON.stringify({
-                                accepted: true,
-                                necessary: true,
-                                preferences: true,
-                                statistics: true,
-                                marketing: true
-                            }));
-                        """)
-                        
-                        # 设置超时
-                        page.set_default_timeout(60000)
-                        
+                    logger.debug("从页面池获取预热页面...")
+                    # 退出时归还页面，出错的页面不会被复用
+                    async with self.page_pool.page("match_result") as page:
                         # 访问页面
                         url = "https://event.5eplay.com/csgo/matches"
                         logger.info(f"第 {attempt + 1} 次尝试访问URL: {url}")
                         
-                        # 延迟
-                        await asyncio.sleep(random.uniform(1.0, 2.0))
-                        logger.debug(f"延迟后开始导航...")
+                        # 可选的反爬虫随机延迟，默认关闭
+                        await self.readiness.jitter.pause()
                         
                         response = await page.goto(url, wait_until="domcontentloaded")
                         
@@ -128,123 +180,39 @@ class MatchResultFetcher:
                             logger.info(f"页面响应状态码: {response.status}")
                             
                             if response.status == 200:
-                                # 等待页面加载
-                                logger.debug("等待页面加载完成...")
-                                await page.wait_for_load_state("networkidle")
-                                await asyncio.sleep(random.uniform(1.0, 2.0))
+                                # 等待赛果按钮出现
+                                logger.debug("等待赛果按钮出现...")
+                                await self.readiness.wait_for_selector(page, 'span.trigger-item:text("赛果")')
                                 
                                 # 查找赛果按钮
                                 logger.debug("查找赛果按钮...")
                                 result_btn = await page.query_selector('span.trigger-item:text("赛果")')
                                 if result_btn:
                                     logger.debug("找到赛果按钮，点击...")
-                                    # 点击赛果按钮
-                                    await result_btn.click()
-                                    
-                                    # 等待页面加载
+                                    # 点击赛果按钮，等待列表切换完成
                                     logger.debug("等待赛果页面加载...")
-                                    await asyncio.sleep(2.0)  # 给页面足够的时间加载
-                                    await page.wait_for_load_state("networkidle")
+                                    await self.readiness.click_and_wait_dom_settled(page, result_btn)
                                     
-                                    # 查找比赛结果项
-                                    logger.debug("查找比赛结果元素...")
-                                    match_items = await page.query_selector_all('div.match-item-row.cp')
+                                    # 一次读取整个比赛列表
+                                    logger.debug("读取比赛结果列表...")
+                                    match_results = await self.read_match_list(page)
                                     
-                                    if match_items and len(match_items) > 0:
-                                        logger.info(f"找到 {len(match_items)} 个比赛结果")
+                                    if match_results:
+                                        logger.info(f"找到 {len(match_results)} 个比赛结果")
                                         
-                                        # 限制最多显示5场比赛结果
-                                        match_count = min(len(match_items), 5)
-                                        logger.debug(f"将提取前 {match_count} 场比赛结果")
-                                        
-                                        for i in range(match_count):
-                                            match_item = match_items[i]
-                                            
-                                            # 修复evaluate调用，将参数合并到JavaScript函数中
-                                            js_function = """(element) => {
-                                                const index = %d;
-                                                return {
-                                                    index: index,
-                                                    selector: `div.match-item-row.cp:nth-of-type(${index + 1})`
-                                                };
-                                            }""" % (i + 1)
-                                            match_element_info = await page.evaluate(js_function, match_item)
-                                            match_elements.append(match_element_info)
-                                            
-                                            # 查找内部的比赛信息元素
-                                            left_item = await match_item.query_selector('div.match-item.match-item-left.flex-horizontal.flex-align-center')
-                                            
-                                            try:
-                                                # 获取比赛时间
-                                                time_element = await left_item.query_selector('div.match-time-star div')
-                                                match_time = await time_element.inner_text() if time_element else "未知时间"
-                                                logger.debug(f"比赛时间: {match_time}")
-                                                
-                                                # 获取队伍名称
-                                                team_elements = await left_item.query_selector_all('div.match-team.flex-vertical.flex-align-center div.cp p.ellip')
-                                                team_names = []
-                                                for team_element in team_elements:
-                                                    team_name = await team_element.inner_text()
-                                                    team_names.append(team_name)
-                                                
-                                                if len(team_names) >= 2:
-                                                    team1_name = team_names[0]
-                                                    team2_name = team_names[1]
-                                                    logger.debug(f"队伍名称: {team1_name} vs {team2_name}")
-                                                else:
-                                                    team1_name = "未知队伍1"
-                                                    team2_name = "未知队伍2"
-                                                    logger.warning(f"未能获取完整队伍名称")
-                                                
-                                                # 获取比分
-                                                score_elements = await left_item.query_selector_all('div.all-score-box div.all-score div')
-                                                scores = []
-                                                for score_element in score_elements:
-                                                    score_text = await score_element.inner_text()
-                                                    scores.append(score_text)
-                                                
-                                                if len(scores) >= 2:
-                                                    team1_score = scores[0]
-                                                    team2_score = scores[1]
-                                                    logger.debug(f"比分: {team1_score}-{team2_score}")
-                                                else:
-                                                    team1_score = "?"
-                                                    team2_score = "?"
-                                                    logger.warning(f"未能获取完整比分")
-                                                
-                                                # 添加到结果列表，包含索引信息
-                                                match_results.append({
-                                                    'index': i + 1,
-                                                    'time': match_time,
-                                                    'team1': team1_name,
-                                                    'team2': team2_name,
-                                                    'score1': team1_score,
-                                                    'score2': team2_score,
-                                                    'selector': match_element_info['selector']
-                                                })
-                                                
-                                            except Exception as e:
-                                                logger.error(f"解析比赛 {i+1} 数据时出错: {str(e)}")
-                                        
-                                        # 比赛数据获取成功 - 不要关闭浏览器，存起来以便后续使用
+                                        # 比赛数据获取成功 - 只保存解析后的数据，返回时立即归还页面
                                         if match_results:
-                                            logger.info(f"成功获取 {len(match_results)} 场比赛结果，保持浏览器会话")
-                                            
                                             # 生成唯一的会话ID
                                             session_id = f"session_{time.time()}"
                                             
-                                            # 存储浏览器和页面以备后续使用
-                                            self.active_browsers[session_id] = {
-                                                'browser': browser,
-                                                'context': context,
-                                                'page': page,
+                                            # 快照在缓存硬过期后再保留一个有效期，保证最后引用它的用户仍可查看详情
+                                            self.sessions.set("match_snapshot", session_id, {
                                                 'results': match_results,
-                                                'elements': match_elements,
                                                 'timestamp': time.time()
-                                            }
-                                            
-                                            # 计划30秒后关闭浏览器
-                                            asyncio.create_task(self.close_browser_after_timeout(session_id, 30))
+                                            }, ttl=self.stale_cache.hard_ttl + self.result_timeout)
+                                            self.latest_snapshot = session_id
+                                            await self.disk_cache.put_json("match_results", "latest", match_results,
+                                                                           ttl=self.stale_cache.hard_ttl)
                                             
                                             return {
                                                 "success": True,
@@ -260,16 +228,12 @@ class MatchResultFetcher:
                                 logger.warning(f"页面返回非200状态码: {response.status}")
                         else:
                             logger.warning("没有收到页面响应")
-                        
-                        # 关闭浏览器
-                        logger.debug("关闭浏览器...")
-                        await browser.close()
-                        
-                        # 如果失败且不是最后一次尝试，则等待后重试
-                        if attempt < max_retries - 1:
-                            retry_time = retry_delay * (attempt + 1)
-                            logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
-                            await asyncio.sleep(retry_time)
+                    
+                    # 如果失败且不是最后一次尝试，则等待后重试
+                    if attempt < max_retries - 1:
+                        retry_time = retry_delay * (attempt + 1)
+                        logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
+                        await asyncio.sleep(retry_time)
                     
                 except Exception as e:
                     logger.error(f"第 {attempt + 1} 次尝试出错: {str(e)}", exc_info=True)
@@ -299,48 +263,153 @@ class MatchResultFetcher:
                 "results": []
             }
     
-    async def close_browser_after_timeout(self, session_id: str, timeout: int):
-        """在指定超时后关闭浏览器"""
-        try:
-            await asyncio.sleep(timeout)
-            if session_id in self.active_browsers:
-                logger.info(f"会话 {session_id} 超时，关闭浏览器")
-                try:
-                    await self.active_browsers[session_id]['browser'].close()
-                except Exception as e:
-                    logger.error(f"关闭浏览器时出错: {str(e)}")
-                finally:
-                    # 清理会话数据
-                    del self.active_browsers[session_id]
-                    
-                    # 清理所有引用此会话的用户记录
-                    users_to_clear = []
-                    for user, sess_id in self.search_results.items():
-                        if sess_id == session_id:
-                            users_to_clear.append(user)
-                    
-                    # 从字典中删除引用
-                    for user in users_to_clear:
-                        if user in self.search_results:
-                            logger.info(f"清理用户 {user} 的过期会话引用")
-                            del self.search_results[user]
-                        if user in self.search_timestamps:
-                            del self.search_timestamps[user]
-        except Exception as e:
-            logger.error(f"关闭浏览器任务出错: {str(e)}")
+    def _match_key(self, match: Dict[str, Any]) -> str:
+        """生成比赛的缓存键，优先使用比赛ID"""
+        if match.get('match_id'):
+            return match['match_id']
+        return f"{match['team1']}|{match['team2']}|{match['time']}"
+    
+    def get_match_link(self, match: Dict[str, Any]) -> Optional[str]:
+        """获取缓存的比赛详情地址"""
+        key = self._match_key(match)
+        cached = self.match_links.get(key)
+        if not cached:
+            return None
+        url, created = cached
+        if time.time() - created > self.match_link_ttl:
+            del self.match_links[key]
+            return None
+        return url
+    
+    def remember_match_link(self, match: Dict[str, Any], url: str):
+        """缓存比赛详情地址，不是详情页的地址不缓存"""
+        if not is_match_detail_url(url):
+            return
+        key = self._match_key(match)
+        # 重新插入，使字典顺序保持为记录时间顺序
+        self.match_links.pop(key, None)
+        self.match_links[key] = (url, time.time())
+        self._sweep_match_links()
+        logger.debug(f"已缓存比赛详情地址: {match['team1']} vs {match['team2']} -> {url}")
+    
+    def _sweep_match_links(self):
+        """清理过期的详情地址，超过上限时移除最早记录的地址"""
+        now = time.time()
+        for key in [key for key, (_, created) in self.match_links.items() if now - created > self.match_link_ttl]:
+            del self.match_links[key]
+        while len(self.match_links) > self.match_link_max:
+            del self.match_links[next(iter(self.match_links))]
+    
+    def forget_match_link(self, match: Dict[str, Any]):
+        """移除失效的比赛详情地址"""
+        self.match_links.pop(self._match_key(match), None)
+    
+    async def read_match_list(self, page) -> List[Dict[str, Any]]:
+        """通过一次evaluate读取页面上的比赛列表"""
+        results = parse_match_rows(await page.evaluate(MATCH_LIST_SCRIPT, MATCH_LIST_ARGS))
+        for match in results:
+            # 列表中直接带有详情地址时记录下来
+            if match['link']:
+                self.remember_match_link(match, match['link'])
+        return results
+    
+    def get_fresh_snapshot(self) -> Optional[str]:
+        """返回仍在共享期内的最新结果快照"""
+        if not self.latest_snapshot:
+            return None
+        snapshot = self.sessions.get("match_snapshot", self.latest_snapshot)
+        if snapshot and time.time() - snapshot['timestamp'] < self.result_timeout:
+            return self.latest_snapshot
+        return None
 
-    async def view_match_details(self, session_id: str, match_index: int) -> Dict[str, Any]:
-        """查看指定比赛的详细信息"""
+    async def _open_detail_from_list(self, page, match_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """从比赛列表点击进入比赛详情，失败时返回错误信息"""
+        team1_name = match_data['team1']
+        team2_name = match_data['team2']
+        
+        # 直接访问比赛结果页面
+        url = "https://event.5eplay.com/csgo/matches"
+        logger.info(f"访问URL: {url}")
+        
+        # 可选的反爬虫随机延迟，默认关闭
+        await self.readiness.jitter.pause()
+        
+        response = await page.goto(url, wait_until="domcontentloaded")
+        
+        if not response or response.status != 200:
+            logger.error(f"页面响应错误，状态码: {response.status if response else 'none'}")
+            return {
+                "success": False,
+                "message": "无法访问比赛页面，请稍后再试",
+                "type": "match_detail_page_error"
+            }
+        
+        # 等待赛果按钮出现
+        await self.readiness.wait_for_selector(page, 'span.trigger-item:text("赛果")')
+        
+        # 查找赛果按钮
+        logger.debug("查找赛果按钮...")
+        result_btn = await page.query_selector('span.trigger-item:text("赛果")')
+        if not result_btn:
+            logger.error("未找到赛果按钮")
+            return {
+                "success": False,
+                "message": "无法找到赛果按钮，请稍后再试",
+                "type": "match_detail_button_not_found"
+            }
+        
+        # 点击赛果按钮，等待列表切换完成
+        await self.readiness.click_and_wait_dom_settled(page, result_btn)
+        logger.debug("已点击赛果按钮")
+        
+        # 找到相似的比赛 - 优先按比赛ID，其次按队伍名称匹配
+        found_match = False
+        current_list = await self.read_match_list(page)
+        
+        logger.info(f"找到 {len(current_list)} 个比赛条目，尝试匹配 {team1_name} vs {team2_name}")
+        
+        for item in current_list:
+            if match_data.get('match_id') and item['match_id']:
+                same_match = item['match_id'] == match_data['match_id']
+            else:
+                same_match = {item['team1'], item['team2']} == {team1_name, team2_name}
+            if not same_match:
+                continue
+            
+            logger.info(f"找到匹配比赛: {item['team1']} vs {item['team2']}")
+            
+            # 点击这个比赛
+            found_match = True
+            await page.locator(MATCH_ROW_SELECTOR).nth(item['row']).click()
+            logger.debug("已点击匹配的比赛")
+            
+            # 等待详情内容渲染完成
+            if await self.readiness.wait_for_selector(page, 'div.free-main-loading.free-main-loading-box'):
+                await self.readiness.wait_for_dom_stable(page, 'div.free-main-loading.free-main-loading-box')
+            break
+        
+        if not found_match:
+            logger.warning(f"未找到匹配的比赛: {team1_name} vs {team2_name}")
+            return {
+                "success": False,
+                "message": f"未在当前页面找到 {team1_name} vs {team2_name} 的比赛",
+                "type": "match_detail_not_found"
+            }
+        
+        return None
+    
+    async def view_match_details(self, session_id: str, match_index: int, admit=None) -> Dict[str, Any]:
+        """查看指定比赛的详细信息，admit用于包装打开页面截图的部分"""
         logger.info(f"查看会话 {session_id} 的比赛 #{match_index} 详细信息")
         
-        if session_id not in self.active_browsers:
+        session_data = self.sessions.get("match_snapshot", session_id)
+        if session_data is None:
             return {
                 "success": False,
                 "message": "会话已过期，请重新获取比赛结果",
                 "type": "match_detail_expired"
             }
-        
-        session_data = self.active_browsers[session_id]
+
         results = session_data['results']
         
         # 检查索引是否有效
@@ -366,6 +435,22 @@ class MatchResultFetcher:
                     "type": "match_detail_not_found"
                 }
             
+            # 只有打开页面截图的部分经过准入调度
+            capture = lambda: self._capture_match_detail(match_data, match_index)
+            return await (admit(capture) if admit else capture())
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"查看比赛详情时出错: {str(e)}", exc_info=True)
+            return {
+                "success": False,
+                "message": f"处理请求时出错: {str(e)}",
+                "type": "match_detail_error"
+            }
+    
+    async def _capture_match_detail(self, match_data: Dict[str, Any], match_index: int) -> Dict[str, Any]:
+        """打开比赛详情页并截图"""
+        try:
             # 重新打开新的浏览器会话，而不是尝试重用可能不稳定的会话
             logger.info("为获取比赛详情创建全新的浏览器会话")
             
@@ -376,149 +461,38 @@ class MatchResultFetcher:
             score2 = match_data['score2']
             match_time = match_data['time']
             
-            # 创建新的浏览器实例
-            from playwright.async_api import async_playwright
-            
-            # 配置浏览器启动参数
-            browser_args = [
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-            
             screenshot_path = os.path.join(self.screenshot_dir, f"match_detail_{match_index}_{int(time.time())}.png")
             
-            async with async_playwright() as p:
-                # 随机选择一个用户代理
-                user_agent = random.choice(USER_AGENTS)
-                
-                logger.debug("启动新的浏览器...")
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=browser_args
-                )
-                
-                logger.debug("创建浏览器上下文...")
-                context = await browser.new_context(
-                    viewport={'width': 1280, 'height': 900},
-                    user_agent=user_agent,
-                    ignore_https_errors=True,
-                    accept_downloads=True,
-                    java_script_enabled=True,
-                    bypass_csp=True
-                )
-                
-                logger.debug("创建新页面...")
-                page = await context.new_page()
-                
-                # 添加反爬虫脚本
-                await page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                    window.localStorage.setItem('CookieConsent', JSON.stringify({
-                        accepted: true, necessary: true, preferences: true, statistics: true, marketing: true
-                    }));
-                """)
-                
-                # 设置超时
-                page.set_default_timeout(60000)
-                
-                # 直接访问比赛结果页面
-                url = "https://event.5eplay.com/csgo/matches"
-                logger.info(f"访问URL: {url}")
-                
-                # 延迟
-                await asyncio.sleep(random.uniform(1.0, 2.0))
-                
-                response = await page.goto(url, wait_until="domcontentloaded")
-                
-                if not response or response.status != 200:
-                    logger.error(f"页面响应错误，状态码: {response.status if response else 'none'}")
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "message": "无法访问比赛页面，请稍后再试",
-                        "type": "match_detail_page_error"
-                    }
-                
-                # 等待页面加载
-                await page.wait_for_load_state("networkidle")
-                await asyncio.sleep(1.5)
-                
-                # 查找赛果按钮
-                logger.debug("查找赛果按钮...")
-                result_btn = await page.query_selector('span.trigger-item:text("赛果")')
-                if not result_btn:
-                    logger.error("未找到赛果按钮")
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "message": "无法找到赛果按钮，请稍后再试",
-                        "type": "match_detail_button_not_found"
-                    }
-                
-                # 点击赛果按钮
-                await result_btn.click()
-                logger.debug("已点击赛果按钮")
-                
-                # 等待加载
-                await page.wait_for_load_state("networkidle")
-                await asyncio.sleep(1.5)
-                
-                # 找到相似的比赛 - 通过队伍名称匹配
-                found_match = False
-                match_items = await page.query_selector_all('div.match-item-row.cp')
-                
-                logger.info(f"找到 {len(match_items)} 个比赛条目，尝试匹配 {team1_name} vs {team2_name}")
-                
-                # 遍历匹配比赛
-                for match_item in match_items:
-                    try:
-                        # 查找内部的比赛信息元素
-                        left_item = await match_item.query_selector('div.match-item.match-item-left.flex-horizontal.flex-align-center')
-                        if not left_item:
-                            continue
-                            
-                        # 获取队伍名称
-                        team_elements = await left_item.query_selector_all('div.match-team.flex-vertical.flex-align-center div.cp p.ellip')
-                        
-                        # 如果找不到两个队伍，则跳过
-                        if len(team_elements) < 2:
-                            continue
-                            
-                        item_team1 = await team_elements[0].inner_text()
-                        item_team2 = await team_elements[1].inner_text()
-                        
-                        logger.debug(f"比较: {item_team1} vs {item_team2} 与 {team1_name} vs {team2_name}")
-                        
-                        # 检查是否匹配
-                        if (item_team1 == team1_name and item_team2 == team2_name) or \
-                           (item_team1 == team2_name and item_team2 == team1_name):
-                            logger.info(f"找到匹配比赛: {item_team1} vs {item_team2}")
-                            
-                            # 点击这个比赛
-                            found_match = True
-                            await match_item.click()
-                            logger.debug("已点击匹配的比赛")
-                            
-                            # 等待页面导航完成
-                            await page.wait_for_load_state("networkidle")
-                            await asyncio.sleep(2)
-                            break
-                            
-                    except Exception as e:
-                        logger.warning(f"处理比赛条目时出错: {str(e)}")
-                        continue
-                
-                if not found_match:
-                    logger.warning(f"未找到匹配的比赛: {team1_name} vs {team2_name}")
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "message": f"未在当前页面找到 {team1_name} vs {team2_name} 的比赛",
-                        "type": "match_detail_not_found"
-                    }
+            logger.debug("从页面池获取预热页面...")
+            async with self.page_pool.page("match_detail") as page:
+                detail_selector = 'div.free-main-loading.free-main-loading-box'
+                opened = False
+                
+                # 已知比赛详情地址时直接访问，跳过列表页，优先使用验证过的地址
+                detail_url = self.get_match_link(match_data) or match_data.get('link')
+                if not is_match_detail_url(detail_url):
+                    detail_url = None
+                if detail_url:
+                    logger.info(f"直接访问比赛详情: {detail_url}")
+                    await self.readiness.jitter.pause()
+                    response = await page.goto(detail_url, wait_until="domcontentloaded")
+                    if response and response.status == 200 and await self.readiness.wait_for_selector(page, detail_selector):
+                        await self.readiness.wait_for_dom_stable(page, detail_selector)
+                        opened = True
+                    else:
+                        logger.warning("直接访问比赛详情失败，改为从比赛列表进入")
+                        # 快照中的比赛数据与其他用户共享，一并清除，之后的查询不再重试失效地址
+                        self.forget_match_link(match_data)
+                        match_data['link'] = ''
+                
+                if not opened:
+                    error = await self._open_detail_from_list(page, match_data)
+                    if error:
+                        return error
+                    # 点击后页面地址变为比赛详情地址时记录下来，供之后直接访问
+                    if is_match_detail_url(page.url):
+                        self.remember_match_link(match_data, page.url)
+                        match_data['link'] = page.url
                 
                 # 隐藏页面右侧边栏、顶部和页脚元素
                 logger.debug("隐藏页面不需要的元素")
@@ -546,8 +520,8 @@ class MatchResultFetcher:
                     }
                 """)
                 
-                # 等待样式应用
-                await asyncio.sleep(1)
+                # 等待下一帧绘制，确保样式应用
+                await self.readiness.wait_for_paint(page)
                 
                 # 查找并截图主要内容区域
                 logger.debug("查找主要内容区域")
@@ -627,8 +601,8 @@ class MatchResultFetcher:
                 
                 # 截图
                 if content_element:
-                    # 在截图之前先等待一秒，确保页面完全渲染
-                    await asyncio.sleep(1)
+                    # 截图前确保内容区域的图片已加载
+                    await self.readiness.wait_for_images(page, 'div.free-main-loading.free-main-loading-box')
                     
                     # 截图前记录页面宽高
                     viewport_size = await page.evaluate("""() => {
@@ -657,11 +631,9 @@ class MatchResultFetcher:
                     else:
                         logger.error(f"✗ 截图文件不存在: {screenshot_path}")
                     
-                    # 关闭浏览器
-                    await browser.close()
-                    
                     # 验证截图是否成功
                     if os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 0:
+                        screenshot_path = await self.content_store.adopt(screenshot_path, "match_detail")
                         return {
                             "success": True,
                             "message": f"已获取比赛 {team1_name} vs {team2_name} 的详细信息",
@@ -682,7 +654,6 @@ class MatchResultFetcher:
                             "type": "match_detail_screenshot_failed"
                         }
                 else:
-                    await browser.close()
                     return {
                         "success": False,
                         "message": "未找到可截图的内容元素",
@@ -697,12 +668,12 @@ class MatchResultFetcher:
                 "type": "match_detail_error"
             }
 
-    def format_results(self, results: List[Dict[str, str]]) -> str:
+    def format_results(self, results: List[Dict[str, str]], age: float = 0.0) -> str:
         """格式化比赛结果为易读的文本"""
         if not results:
             return "没有找到最近的比赛结果"
         
-        formatted = "📊 最近的CS:GO比赛结果:\n" + "═" * 35 + "\n\n"
+        formatted = f"📊 最近的CS:GO比赛结果（{describe_age(age)}）:\n" + "═" * 35 + "\n\n"
         
         for i, match in enumerate(results, 1):
             index = match.get('index', i)  # 使用保存的索引或默认为循环索引
@@ -712,12 +683,41 @@ class MatchResultFetcher:
                 formatted += "\n" + "─" * 30 + "\n\n"
         
         # 添加使用说明
-        formatted += "\n📌 在30秒内发送 '比赛[数字]' 查看对应比赛的详细信息，例如：比赛1"
+        formatted += "\n" + DETAIL_HINT
         
         return formatted
     
-    async def process_command(self, command: str, user_id: str = "default_user") -> Dict[str, Any]:
-        """处理比赛结果命令"""
+    async def _restore_results(self):
+        """插件重载后从磁盘缓存恢复最近一次的比赛结果"""
+        cached = await self.disk_cache.get_json("match_results", "latest")
+        if not cached:
+            return
+        created = cached["created"]
+        session_id = f"session_{created}"
+        age = time.time() - created
+        self.sessions.set("match_snapshot", session_id, {
+            'results': cached["value"],
+            'timestamp': created
+        }, ttl=max(0.0, self.stale_cache.hard_ttl - age) + self.result_timeout)
+        self.latest_snapshot = session_id
+        for match in cached["value"]:
+            if match.get('link'):
+                self.remember_match_link(match, match['link'])
+        
+        logger.info(f"从磁盘缓存恢复比赛结果快照 {session_id}，数据已有 {int(age)} 秒")
+        self.stale_cache.put("match_results", {
+            "success": True,
+            "message": "获取比赛结果成功",
+            "results": cached["value"],
+            "session_id": session_id
+        }, fetched_at=created)
+
+    def _usable_results(self, results: Dict[str, Any]) -> bool:
+        """抓取成功且快照仍然存在的比赛结果才能缓存和复用"""
+        return bool(results.get("success")) and self.sessions.get("match_snapshot", results["session_id"]) is not None
+
+    async def process_command(self, command: str, user_id: str = "default_user", admit=None) -> Dict[str, Any]:
+        """处理比赛结果和比赛详情命令，admit用于包装需要打开页面的实时抓取"""
         command = command.strip()
         
         # 增加调试日志以追踪用户ID
@@ -727,61 +727,37 @@ class MatchResultFetcher:
         if command in ["比赛结果", "/比赛结果"]:
             try:
                 # 记录当前所有会话状态
-                logger.debug(f"当前活跃浏览器会话: {list(self.active_browsers.keys())}")
-                logger.debug(f"当前用户会话映射: {self.search_results}")
+                logger.debug(f"当前会话存储: {self.sessions.stats()}")
                 
                 # 获取比赛结果数据
                 logger.info("开始获取比赛结果数据")
                 
-                # 如果用户已经有一个活跃会话，先检查其有效性
-                if user_id in self.search_results:
-                    session_id = self.search_results[user_id]
-                    if session_id in self.active_browsers:
-                        try:
-                            browser = self.active_browsers[session_id]['browser']
-                            page = self.active_browsers[session_id]['page']
-                            
-                            # 检查浏览器连接和页面是否打开
-                            if browser.is_connected() and not page.is_closed():
-                                # 延长这个会话的生命周期
-                                logger.info(f"用户 {user_id} 已有活跃会话 {session_id}，延长其有效期")
-                                self.search_timestamps[user_id] = time.time()
-                                
-                                # 重新格式化已有的结果
-                                existing_results = self.active_browsers[session_id]['results']
-                                formatted_results = self.format_results(existing_results)
-                                
-                                return {
-                                    "success": True,
-                                    "message": formatted_results,
-                                    "type": "match_results",
-                                    "session_id": session_id
-                                }
-                        except Exception as e:
-                            logger.warning(f"检查现有会话时出错: {str(e)}")
-                            # 继续创建新会话
-                
-                # 获取新的比赛结果
-                results = await self.get_match_results()
+                # 缓存未硬过期时直接使用最新快照，超过软期限时在后台刷新
+                if self.stale_cache.peek("match_results", self._usable_results) is None:
+                    await self._restore_results()
+                results, age = await self.stale_cache.get(
+                    "match_results", self.get_match_results, admit=admit, valid=self._usable_results
+                )
                 
                 if results["success"]:
                     # 保存会话ID和用户关联
                     session_id = results["session_id"]
-                    self.search_results[user_id] = session_id
-                    self.search_timestamps[user_id] = time.time()
+                    self.sessions.set("match_user", user_id, session_id, ttl=self.result_timeout)
                     
                     # 记录会话存储情况以便调试
-                    logger.info(f"已保存用户 {user_id} 的会话ID: {session_id}, 当前用户会话数: {len(self.search_results)}")
+                    logger.info(f"已保存用户 {user_id} 的会话ID: {session_id}, 当前会话总数: {len(self.sessions)}")
                     
                     # 格式化结果
-                    formatted_results = self.format_results(results["results"])
+                    formatted_results = self.format_results(results["results"], age)
                     logger.info("成功格式化比赛结果")
                     
                     return {
                         "success": True,
                         "message": formatted_results,
                         "type": "match_results",
-                        "session_id": session_id
+                        "session_id": session_id,
+                        "results": results["results"],
+                        "age": age
                     }
                 else:
                     logger.error("未能获取比赛结果")
@@ -790,6 +766,8 @@ class MatchResultFetcher:
                         "message": results["message"],
                         "type": "match_results"
                     }
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 logger.error(f"处理比赛结果命令时出错: {str(e)}", exc_info=True)
                 return {
@@ -806,54 +784,26 @@ class MatchResultFetcher:
                 
                 # 记录查询的会话情况
                 logger.info(f"用户 {user_id} 请求查看比赛 #{match_index}")
-                logger.info(f"当前存储的会话用户IDs: {list(self.search_results.keys())}")
-                logger.info(f"当前用户会话ID映射: {self.search_results}")
                 
-                # 检查用户是否有活跃的会话
-                if user_id not in self.search_results or user_id not in self.search_timestamps:
+                # 检查用户是否有活跃的会话，过期的会话已被会话存储清理
+                session_id = self.sessions.get("match_user", user_id)
+                if session_id is None:
                     logger.warning(f"用户 {user_id} 没有活跃会话")
                     
-                    # 尝试查看是否有可用的浏览器会话，如果有则为此用户创建
-                    if self.active_browsers:
-                        # 找到最新的会话
-                        newest_session_id = sorted(
-                            self.active_browsers.keys(),
-                            key=lambda sid: self.active_browsers[sid]['timestamp'],
-                            reverse=True
-                        )[0]
-                        
-                        logger.info(f"为用户 {user_id} 分配现有会话: {newest_session_id}")
-                        self.search_results[user_id] = newest_session_id
-                        self.search_timestamps[user_id] = time.time()
-                        
-                        # 继续处理请求...
+                    # 尝试查看是否有共享期内的结果快照，如果有则为此用户创建
+                    session_id = self.get_fresh_snapshot()
+                    if session_id:
+                        logger.info(f"为用户 {user_id} 分配现有会话: {session_id}")
+                        self.sessions.set("match_user", user_id, session_id, ttl=self.result_timeout)
                     else:
                         return {
                             "success": False,
-                            "message": "请先使用'比赛结果'命令查询最近的比赛",
+                            "message": "会话已过期或不存在，请先使用'比赛结果'命令查询最近的比赛",
                             "type": "match_detail_no_session"
                         }
                 
-                # 检查会话是否过期
-                elapsed = time.time() - self.search_timestamps[user_id]
-                if elapsed > self.result_timeout:
-                    # 清理过期数据
-                    if user_id in self.search_results:
-                        del self.search_results[user_id]
-                    if user_id in self.search_timestamps:
-                        del self.search_timestamps[user_id]
-                    
-                    return {
-                        "success": False,
-                        "message": "会话已过期，请重新使用'比赛结果'命令",
-                        "type": "match_detail_expired"
-                    }
-                
-                # 获取会话ID
-                session_id = self.search_results[user_id]
-                
                 # 查看详细比赛信息
-                return await self.view_match_details(session_id, match_index)
+                return await self.view_match_details(session_id, match_index, admit=admit)
                 
             except ValueError:
                 return {
@@ -861,6 +811,8 @@ class MatchResultFetcher:
                     "message": "请输入有效的比赛编号",
                     "type": "match_detail_invalid_input"
                 }
+            except AdmissionRejected:
+                raise
             except Exception as e:
                 logger.error(f"处理比赛详情命令时出错: {str(e)}", exc_info=True)
                 return {
@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .fuzzy_index import TrigramIndex
+except ImportError:
+    from fuzzy_index import TrigramIndex
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('name_index')
+
+class NameEntry:
+    """一条名称记录，预先计算好用于匹配的小写和去空格形式"""
+
+    def __init__(self, key: str, name: str, value: Any):
+        self.key = key
+        self.name = name
+        self.value = value
+        self.lower = name.lower()
+        self.no_space = self.lower.replace(" ", "")
+
+class NameSnapshot(dict):
+    """某一时刻的名称数据快照，加载完成后不再修改"""
+
+    def __init__(self, items: Dict[str, Any], entries: List[NameEntry],
+                 signature: Optional[Tuple[float, int]] = None, match_no_space: bool = False):
+        super().__init__(items)
+        self.entries = entries
+        # 模糊搜索使用的三元组索引
+        self.fuzzy = TrigramIndex(entries, match_no_space=match_no_space)
+        # 加载时文件的(mtime, size)
+        self.signature = signature
+
+class NameIndex:
+    """内存中的名称索引，文件修改时间或大小变化后在后台重新加载"""
+
+    def __init__(self, path: str, parser: Callable[[str], Dict[str, Any]],
+                 name_of: Callable[[str, Any], str], label: str = "名称",
+                 check_interval: float = 5.0, match_no_space: bool = False):
+        """初始化名称索引"""
+        self.path = path
+        # 解析文件，返回 键 -> 值 的字典
+        self.parser = parser
+        # 由键和值取出用于匹配的名称
+        self.name_of = name_of
+        self.label = label
+        # 两次检查文件变化的最小间隔（秒）
+        self.check_interval = check_interval
+        # 模糊搜索时是否同时匹配去空格的名称
+        self.match_no_space = match_no_space
+
+        self._snapshot: Optional[NameSnapshot] = None
+        self._loading: Optional[asyncio.Task] = None
+        self._last_check = 0.0
+        self.reloads = 0
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        """读取文件的修改时间和大小"""
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self) -> NameSnapshot:
+        """读取并解析文件，在线程池中执行"""
+        signature = self._stat()
+        items = self.parser(self.path)
+        entries = [NameEntry(key, self.name_of(key, value), value) for key, value in items.items()]
+        return NameSnapshot(items, entries, signature, self.match_no_space)
+
+    async def _reload(self):
+        """重新加载文件，完成后整体替换快照"""
+        start = time.monotonic()
+        snapshot = await asyncio.get_running_loop().run_in_executor(None, self._load)
+        self._snapshot = snapshot
+        self.reloads += 1
+        logger.info(f"已加载 {len(snapshot)} 条{self.label}数据，用时 {time.monotonic() - start:.3f} 秒")
+
+    async def _check(self):
+        """文件变化时重新加载"""
+        try:
+            signature = await asyncio.get_running_loop().run_in_executor(None, self._stat)
+            if signature is not None and signature != self._snapshot.signature:
+                logger.info(f"{self.label}文件已变化，后台重新加载")
+                await self._reload()
+        except Exception as e:
+            logger.error(f"重新加载{self.label}数据失败，继续使用旧数据: {str(e)}")
+
+    def _schedule_check(self):
+        """在后台检查文件是否变化"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        if self._loading and not self._loading.done():
+            return
+        self._last_check = now
+        self._loading = asyncio.create_task(self._check())
+
+    async def get(self) -> NameSnapshot:
+        """返回当前快照，只有首次加载需要等待"""
+        if self._snapshot is None:
+            if self._loading is None or self._loading.done():
+                self._loading = asyncio.create_task(self._reload())
+            try:
+                await asyncio.shield(self._loading)
+            except Exception as e:
+                logger.error(f"加载{self.label}数据失败: {str(e)}")
+                return NameSnapshot({}, [])
+            self._last_check = time.monotonic()
+        else:
+            self._schedule_check()
+        return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """返回索引统计"""
+        return {
+            "entries": len(self._snapshot) if self._snapshot is not None else 0,
+            "reloads": self.reloads,
+        }
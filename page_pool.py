@@ -0,0 +1,274 @@
+import asyncio
+import random
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Any, Tuple
+
+try:
+    from .browser_pool import BrowserPool
+    from .resource_blocker import ResourceBlockPolicy
+except ImportError:
+    from browser_pool import BrowserPool
+    from resource_blocker import ResourceBlockPolicy
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('page_pool')
+
+# 用户代理列表，用于反爬虫
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
+]
+
+# 通用请求头
+EXTRA_HTTP_HEADERS = {
+    'Accept': '*/*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+}
+
+# 反爬虫脚本
+ANTI_BOT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    window.localStorage.setItem('CookieConsent', JSON.stringify({
+        accepted: true,
+        necessary: true,
+        preferences: true,
+        statistics: true,
+        marketing: true
+    }));
+"""
+
+# 启动时预热的页面类型，只预热最常用的查询，为实时请求留出位置
+WARM_PROFILES = ("player", "team", "match_result")
+
+# 各类查询使用的页面配置
+PAGE_PROFILES = {
+    "player": {"viewport": {'width': 1920, 'height': 1080}, "headers": True},
+    "team": {"viewport": {'width': 1920, 'height': 1080}, "headers": True},
+    "recent_match": {"viewport": {'width': 1280, 'height': 900}, "headers": True},
+    "match_result": {"viewport": {'width': 1280, 'height': 900}, "headers": True},
+    "match_detail": {"viewport": {'width': 1280, 'height': 900}, "headers": False},
+}
+
+class PooledPage:
+    """页面池中的一个页面及其所属上下文"""
+
+    def __init__(self, profile: str, context, page):
+        self.profile = profile
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    def is_alive(self) -> bool:
+        """检查页面和浏览器是否仍然可用"""
+        try:
+            return not self.page.is_closed() and self.context.browser.is_connected()
+        except Exception:
+            return False
+
+class PagePool:
+    """预热的页面池，页面创建时已完成上下文、请求头和反爬虫脚本的设置"""
+
+    def __init__(self, browser_pool: Optional[BrowserPool] = None, warm_pages: int = 1,
+                 default_timeout: int = 60000, max_uses: int = 20,
+                 block_policies: Optional[Dict[str, ResourceBlockPolicy]] = None,
+                 warm_profiles: Tuple[str, ...] = WARM_PROFILES):
+        """初始化页面池"""
+        self.browser_pool = browser_pool or BrowserPool()
+        # 启动时预热的页面类型，其他类型在第一次使用后才补充
+        self.warm_profiles = tuple(profile for profile in warm_profiles if profile in PAGE_PROFILES)
+        # 各类页面的请求拦截规则，未配置的类型不拦截
+        self.block_policies = block_policies or {}
+        self.warm_pages = max(0, int(warm_pages))
+        self.default_timeout = default_timeout
+        # 单个页面最多复用的次数，超过后丢弃重建
+        self.max_uses = max(1, int(max_uses))
+
+        self._ready: Dict[str, deque] = {profile: deque() for profile in PAGE_PROFILES}
+        # 各类型正在使用中的页面数量，归还后优先复用，不提前补充
+        self._checked_out: Dict[str, int] = {profile: 0 for profile in PAGE_PROFILES}
+        self._refilling: Dict[str, asyncio.Task] = {}
+        self._closed = False
+
+    async def start(self):
+        """启动底层浏览器池"""
+        await self.browser_pool.start()
+
+    async def _create_page(self, profile: str, launch: bool = True) -> Optional[PooledPage]:
+        """按配置创建一个已完成初始化的页面，launch为False时只使用已启动浏览器的空位，没有空位时返回None"""
+        settings = PAGE_PROFILES[profile]
+
+        # 随机选择一个用户代理
+        user_agent = random.choice(USER_AGENTS)
+        logger.debug(f"为 {profile} 创建页面，User-Agent: {user_agent}")
+
+        context_options = {
+            "viewport": settings["viewport"],
+            "user_agent": user_agent,
+            "ignore_https_errors": True,
+            "accept_downloads": True,
+            "java_script_enabled": True,
+            "bypass_csp": True,
+        }
+        if settings["headers"]:
+            context_options["extra_http_headers"] = dict(EXTRA_HTTP_HEADERS)
+
+        if launch:
+            context = await self.browser_pool.acquire_context(**context_options)
+        else:
+            context = await self.browser_pool.try_acquire_context(**context_options)
+            if context is None:
+                return None
+        try:
+            page = await context.new_page()
+            # 添加反爬虫脚本
+            await page.add_init_script(ANTI_BOT_SCRIPT)
+            # 设置超时
+            page.set_default_timeout(self.default_timeout)
+            # 拦截不需要的资源
+            policy = self.block_policies.get(profile)
+            if policy:
+                await policy.install(page)
+        except Exception:
+            await self.browser_pool.release_context(context)
+            raise
+        return PooledPage(profile, context, page)
+
+    async def _discard(self, pooled: PooledPage):
+        """关闭页面所属的上下文"""
+        await self.browser_pool.release_context(pooled.context)
+
+    async def _reset(self, pooled: PooledPage) -> bool:
+        """重置页面状态以便复用，清除网站的本地存储和cookie"""
+        try:
+            # 离开网站前清除当前站点的localStorage和sessionStorage
+            await pooled.page.evaluate("() => { try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} }")
+            await pooled.page.goto("about:blank")
+            await pooled.context.clear_cookies()
+            return True
+        except Exception as e:
+            logger.warning(f"重置页面失败: {str(e)}")
+            return False
+
+    async def _make_room(self, profile: str):
+        """已启动的浏览器没有空位时，先释放其他类型的空闲页面，而不是启动新浏览器"""
+        if self.browser_pool.has_free_slot():
+            return
+        for other, ready in self._ready.items():
+            if other != profile and ready:
+                logger.debug(f"浏览器池已满，释放一个空闲的 {other} 页面")
+                await self._discard(ready.popleft())
+                return
+
+    async def acquire(self, profile: str) -> PooledPage:
+        """获取一个可直接导航的页面"""
+        if profile not in PAGE_PROFILES:
+            raise ValueError(f"未知的页面类型: {profile}")
+        if self._closed:
+            raise RuntimeError("页面池已关闭")
+
+        ready = self._ready[profile]
+        pooled = None
+        while ready:
+            candidate = ready.popleft()
+            if candidate.is_alive():
+                pooled = candidate
+                break
+            await self._discard(candidate)
+
+        if pooled is None:
+            logger.debug(f"没有可用的预热 {profile} 页面，立即创建")
+            await self._make_room(profile)
+            pooled = await self._create_page(profile)
+        else:
+            logger.debug(f"使用预热的 {profile} 页面")
+
+        pooled.uses += 1
+        self._checked_out[profile] += 1
+        return pooled
+
+    async def release(self, pooled: PooledPage, reusable: bool = True):
+        """归还页面，可复用时重置后放回池中，否则关闭并在后台补充"""
+        ready = self._ready[pooled.profile]
+        try:
+            if (reusable and not self._closed and len(ready) < self.warm_pages
+                    and pooled.uses < self.max_uses and pooled.is_alive()
+                    and await self._reset(pooled)):
+                ready.append(pooled)
+                return
+            await self._discard(pooled)
+        finally:
+            self._checked_out[pooled.profile] -= 1
+        self._schedule_refill(pooled.profile)
+
+    @asynccontextmanager
+    async def page(self, profile: str):
+        """以上下文管理器的方式使用页面，出错的页面不会被复用"""
+        pooled = await self.acquire(profile)
+        reusable = True
+        try:
+            yield pooled.page
+        except BaseException:
+            reusable = False
+            raise
+        finally:
+            await self.release(pooled, reusable=reusable)
+
+    def _schedule_refill(self, profile: str):
+        """在后台补充预热页面"""
+        if self._closed or self.warm_pages == 0:
+            return
+        task = self._refilling.get(profile)
+        if task and not task.done():
+            return
+        self._refilling[profile] = asyncio.create_task(self._refill(profile))
+
+    async def _refill(self, profile: str):
+        """补充指定类型的预热页面"""
+        ready = self._ready[profile]
+        try:
+            # 使用中的页面归还后会被复用，只补足差额
+            while not self._closed and len(ready) + self._checked_out[profile] < self.warm_pages:
+                # 只使用已启动浏览器的空位，不为预热页面启动新浏览器，也不抢占正在处理请求的位置
+                pooled = await self._create_page(profile, launch=False)
+                if pooled is None:
+                    break
+                if self._closed:
+                    await self._discard(pooled)
+                    break
+                ready.append(pooled)
+                logger.debug(f"已补充预热 {profile} 页面，当前数量: {len(ready)}")
+        except Exception as e:
+            logger.warning(f"补充预热 {profile} 页面失败: {str(e)}")
+
+    async def warm_up(self):
+        """为常用的查询类型预热页面"""
+        await self.start()
+        for profile in self.warm_profiles:
+            self._schedule_refill(profile)
+        tasks = [task for task in self._refilling.values() if not task.done()]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"页面池预热完成: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各类型预热页面数量"""
+        return {profile: len(ready) for profile, ready in self._ready.items()}
+
+    async def close(self):
+        """关闭页面池和底层浏览器池"""
+        self._closed = True
+        for task in self._refilling.values():
+            if not task.done():
+                task.cancel()
+        for ready in self._ready.values():
+            while ready:
+                await self._discard(ready.popleft())
+        await self.browser_pool.close()
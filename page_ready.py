@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import random
+import time
+import logging
+from typing import Optional
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+except ImportError:
+    PlaywrightTimeoutError = asyncio.TimeoutError
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('page_ready')
+
+# 用于生成DOM监听器的唯一标识
+_watch_ids = itertools.count()
+
+# 监听DOM变化，变化停止quiet毫秒后视为稳定
+DOM_OBSERVER_SCRIPT = """
+([selector, key]) => {
+    const root = (selector && document.querySelector(selector)) || document.body;
+    const state = {mutated: false, last: performance.now()};
+    const observer = new MutationObserver(() => {
+        state.mutated = true;
+        state.last = performance.now();
+    });
+    observer.observe(root, {childList: true, subtree: true, characterData: true, attributes: true});
+    window[key] = {state, observer};
+}
+"""
+
+DOM_SETTLED_CHECK = """
+([key, quiet, requireMutation]) => {
+    const watcher = window[key];
+    if (!watcher) return true;
+    const {state, observer} = watcher;
+    if (requireMutation && !state.mutated) return false;
+    if (performance.now() - state.last < quiet) return false;
+    observer.disconnect();
+    delete window[key];
+    return true;
+}
+"""
+
+# 检查区域内的图片是否全部加载完成
+IMAGES_LOADED_CHECK = """
+(selector) => {
+    const root = (selector && document.querySelector(selector)) || document;
+    // 懒加载的图片会在截图滚动时再加载，这里不等待
+    return Array.from(root.querySelectorAll('img'))
+        .filter(img => img.loading !== 'lazy')
+        .every(img => img.complete);
+}
+"""
+
+class JitterPolicy:
+    """反爬虫随机延迟策略，默认关闭"""
+
+    def __init__(self, enabled: bool = False, min_delay: float = 1.0, max_delay: float = 2.0):
+        self.enabled = enabled
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+
+    async def pause(self, scale: float = 1.0):
+        """按策略随机等待一段时间"""
+        if not self.enabled:
+            return
+        delay = random.uniform(self.min_delay, self.max_delay) * scale
+        logger.debug(f"随机延迟 {delay:.2f} 秒")
+        await asyncio.sleep(delay)
+
+class PageReadiness:
+    """基于选择器和DOM变化的页面就绪等待"""
+
+    def __init__(self, step_timeout: int = 10000, quiet_ms: int = 300,
+                 jitter: Optional[JitterPolicy] = None):
+        """初始化就绪等待策略"""
+        # 每一步的最长等待时间（毫秒）
+        self.step_timeout = int(step_timeout)
+        # DOM多久没有变化视为稳定（毫秒）
+        self.quiet_ms = int(quiet_ms)
+        self.jitter = jitter or JitterPolicy()
+
+    async def wait_for_selector(self, page, selector: str, state: str = "visible",
+                                timeout: Optional[int] = None) -> bool:
+        """等待指定元素出现，超时返回False"""
+        start = time.monotonic()
+        try:
+            await page.wait_for_selector(selector, state=state, timeout=timeout or self.step_timeout)
+            logger.debug(f"元素 {selector} 已就绪，用时 {time.monotonic() - start:.2f} 秒")
+            return True
+        except PlaywrightTimeoutError:
+            logger.warning(f"等待元素 {selector} 超时")
+            return False
+
+    async def wait_for_dom_stable(self, page, selector: Optional[str] = None,
+                                  timeout: Optional[int] = None) -> bool:
+        """等待指定区域的DOM停止变化"""
+        key = f"__5e_ready_{next(_watch_ids)}"
+        await page.evaluate(DOM_OBSERVER_SCRIPT, [selector, key])
+        return await self._wait_settled(page, key, False, timeout)
+
+    async def click_and_wait_dom_settled(self, page, element, selector: Optional[str] = None,
+                                         timeout: Optional[int] = None) -> bool:
+        """点击元素，等待其引起的DOM变化完成"""
+        key = f"__5e_ready_{next(_watch_ids)}"
+        await page.evaluate(DOM_OBSERVER_SCRIPT, [selector, key])
+        await element.click()
+        return await self._wait_settled(page, key, True, timeout)
+
+    async def _wait_settled(self, page, key: str, require_mutation: bool,
+                            timeout: Optional[int]) -> bool:
+        """轮询DOM监听状态直到稳定"""
+        start = time.monotonic()
+        try:
+            await page.wait_for_function(
+                DOM_SETTLED_CHECK,
+                arg=[key, self.quiet_ms, require_mutation],
+                polling=100,
+                timeout=timeout or self.step_timeout
+            )
+            logger.debug(f"DOM已稳定，用时 {time.monotonic() - start:.2f} 秒")
+            return True
+        except PlaywrightTimeoutError:
+            logger.warning("等待DOM稳定超时")
+            return False
+
+    async def wait_for_images(self, page, selector: Optional[str] = None,
+                              timeout: Optional[int] = None) -> bool:
+        """等待区域内的图片加载完成，截图前使用"""
+        try:
+            await page.wait_for_function(IMAGES_LOADED_CHECK, arg=selector, polling=100,
+                                         timeout=timeout or self.step_timeout)
+            return True
+        except PlaywrightTimeoutError:
+            logger.warning(f"等待 {selector or '页面'} 内图片加载超时")
+            return False
+
+    async def wait_for_paint(self, page):
+        """等待浏览器完成下一帧绘制，确保修改的样式已生效"""
+        await page.evaluate(
+            "() => new Promise(resolve => requestAnimationFrame(() => requestAnimationFrame(resolve)))"
+        )
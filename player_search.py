@@ -1,45 +1,74 @@
 import os
 import re
 import asyncio
-import random
 import time
 from difflib import SequenceMatcher
 import logging
-from typing import Dict, List, Tuple, Optional, Union, Any
-import subprocess
-import sys
-import platform
+from typing import Callable, Dict, List, Tuple, Optional, Any
+
+try:
+    from .page_pool import PagePool
+    from .page_ready import PageReadiness
+    from .screenshot_cache import ScreenshotCache
+    from .single_flight import SingleFlight
+    from .name_index import NameIndex
+    from .session_store import SessionStore
+    from .disk_cache import DiskCache
+    from .content_store import ContentStore
+    from .stats_extractor import EXTRACT_STATS_SCRIPT, ELEMENT_TEXT_SCRIPT, text_fingerprint, build_player_data, has_stats
+except ImportError:
+    from page_pool import PagePool
+    from page_ready import PageReadiness
+    from screenshot_cache import ScreenshotCache
+    from single_flight import SingleFlight
+    from name_index import NameIndex
+    from session_store import SessionStore
+    from disk_cache import DiskCache
+    from content_store import ContentStore
+    from stats_extractor import EXTRACT_STATS_SCRIPT, ELEMENT_TEXT_SCRIPT, text_fingerprint, build_player_data, has_stats
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('player_search')
 
-# 用户代理列表，用于反爬虫
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-]
-
 class PlayerSearcher:
     """CS:GO 选手数据查询类"""
     
-    def __init__(self):
+    def __init__(self, page_pool: Optional[PagePool] = None,
+                 readiness: Optional[PageReadiness] = None,
+                 screenshot_cache: Optional[ScreenshotCache] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 sessions: Optional[SessionStore] = None,
+                 disk_cache: Optional[DiskCache] = None,
+                 content_store: Optional[ContentStore] = None):
         """初始化查询器"""
+        # 共享的页面池，未传入时使用独立的页面池
+        self.page_pool = page_pool or PagePool()
+        # 页面就绪等待策略
+        self.readiness = readiness or PageReadiness()
+        # 截图缓存
+        self.screenshot_cache = screenshot_cache or ScreenshotCache()
+        # 合并并发的相同抓取
+        self.single_flight = single_flight or SingleFlight()
+        # 插件重载后仍然有效的截图和数据缓存
+        self.disk_cache = disk_cache or DiskCache(os.path.join(os.path.dirname(__file__), "cache"))
+        
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir, exist_ok=True)
+        # 截图按内容哈希命名，内容相同的截图只保留一份
+        self.content_store = content_store or ContentStore(self.screenshot_dir)
             
-        # 存储用户搜索结果
-        self.search_results = {}
-        self.search_timestamps = {}
+        # 存储用户搜索结果，过期后自动清理
+        self.sessions = sessions if sessions is not None else SessionStore()
         self.result_timeout = 30  # 结果有效期（秒）
         
         # 加载选手数据
         self.players_file = os.path.join(os.path.dirname(__file__), "players.txt")
         self.ensure_players_file_exists()
+        # 选手数据只解析一次，文件变化后在后台重新加载
+        self.player_index = NameIndex(self.players_file, self.parse_player_file,
+                                      lambda player_id, player_name: player_name, label="选手")
     
     def ensure_players_file_exists(self):
         """确保players.txt文件存在"""
@@ -54,28 +83,33 @@ class PlayerSearcher:
                 f.write("7998|device\n")
             logger.info("已创建示例players.txt文件")
     
-    async def load_player_data(self) -> Dict[str, str]:
-        """从players.txt加载选手数据"""
+    def parse_player_file(self, path: str) -> Dict[str, str]:
+        """解析players.txt文件"""
         players = {}
-        try:
-            with open(self.players_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#"):  # 跳过注释行
-                        # 使用竖线分隔ID和选手名
-                        if "|" in line:
-                            parts = line.split("|", 1)  # 最多分割一次，以防选手名中含有竖线
-                            if len(parts) == 2:
-                                player_id = parts[0].strip()
-                                player_name = parts[1].strip()
-                                players[player_id] = player_name
-            logger.info(f"成功加载 {len(players)} 名选手数据")
-        except Exception as e:
-            logger.error(f"加载选手数据失败: {str(e)}")
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):  # 跳过注释行
+                    # 使用竖线分隔ID和选手名
+                    if "|" in line:
+                        parts = line.split("|", 1)  # 最多分割一次，以防选手名中含有竖线
+                        if len(parts) == 2:
+                            player_id = parts[0].strip()
+                            player_name = parts[1].strip()
+                            players[player_id] = player_name
         return players
     
+    async def load_player_data(self) -> Dict[str, str]:
+        """从内存索引获取选手数据"""
+        return await self.player_index.get()
+    
     def fuzzy_match(self, query: str, choices: Dict[str, str]) -> List[Tuple[str, str, float]]:
         """模糊匹配选手名称"""
+        # 索引快照使用三元组倒排索引，只对候选计算相似度
+        fuzzy = getattr(choices, "fuzzy", None)
+        if fuzzy is not None:
+            return [(entry.key, entry.name, score) for entry, score in fuzzy.search(query)]
+        
         results = []
         query = query.lower()
         
@@ -116,9 +150,8 @@ class PlayerSearcher:
         if not matches:
             return {"message": f"未找到与 '{player_name}' 相关的选手"}
         
-        # 保存搜索结果和时间戳
-        self.search_results[user_id] = matches
-        self.search_timestamps[user_id] = time.time()
+        # 保存搜索结果
+        self.sessions.set("player_search", user_id, matches, ttl=self.result_timeout)
         
         # 格式化搜索结果
         result_message = "🔍 搜索结果：\n" + "═" * 30 + "\n\n"
@@ -139,32 +172,21 @@ class PlayerSearcher:
             logger.warning(f"命令格式错误: {message}")
             return {"message": "命令格式错误，正确格式为：选手[数字]"}
         
-        # 检查是否有最近的搜索结果
-        if user_id not in self.search_results or user_id not in self.search_timestamps:
-            logger.warning(f"用户 {user_id} 未找到搜索结果或时间戳")
-            return {"message": "请先使用 /搜索选手 命令查询选手"}
-        
-        # 检查结果是否过期
-        current_time = time.time()
-        last_search_time = self.search_timestamps[user_id]
-        elapsed_time = current_time - last_search_time
-        logger.debug(f"用户 {user_id} 搜索结果时间: {last_search_time}, 当前时间: {current_time}, 经过时间: {elapsed_time}秒")
-        
-        if elapsed_time > self.result_timeout:
-            logger.info(f"用户 {user_id} 的搜索结果已过期 ({elapsed_time}秒 > {self.result_timeout}秒), 清理数据")
-            del self.search_results[user_id]
-            del self.search_timestamps[user_id]
-            return {"message": f"搜索结果已过期，请重新搜索"}
+        # 检查是否有最近的搜索结果，过期的结果已被会话存储清理
+        matches = self.sessions.get("player_search", user_id)
+        if matches is None:
+            logger.warning(f"用户 {user_id} 没有有效的搜索结果")
+            return {"message": f"没有有效的搜索结果，请先使用 /搜索选手 命令查询选手（结果{self.result_timeout}秒内有效）"}
         
         try:
             index = int(match.group(1))
             logger.debug(f"解析的索引号: {index}")
             
-            if index < 1 or index > len(self.search_results[user_id]):
-                logger.warning(f"索引超出范围: {index}, 可用范围: 1-{len(self.search_results[user_id])}")
-                return {"message": f"请输入1到{len(self.search_results[user_id])}之间的数字"}
+            if index < 1 or index > len(matches):
+                logger.warning(f"索引超出范围: {index}, 可用范围: 1-{len(matches)}")
+                return {"message": f"请输入1到{len(matches)}之间的数字"}
             
-            player_id, player_name, _ = self.search_results[user_id][index - 1]
+            player_id, player_name, _ = matches[index - 1]
             logger.info(f"用户 {user_id} 选择了索引 {index}: player_id={player_id}, player_name={player_name}")
             
             return {
@@ -181,28 +203,41 @@ class PlayerSearcher:
             logger.error(f"view_player_cmd 处理过程中出错: {str(e)}", exc_info=True)
             return {"message": f"处理请求时出错: {str(e)}"}
     
-    async def get_player_stats(self, player_id: str, player_name: str) -> Optional[str]:
-        """获取选手统计数据并截图"""
+    async def get_player_stats(self, player_id: str, player_name: str, admit: Optional[Callable] = None) -> Optional[str]:
+        """获取选手统计数据并截图，admit用于包装实时抓取"""
         logger.info(f"开始获取选手 {player_name}(ID:{player_id}) 的统计数据")
         
+        # 缓存中有仍然有效的截图时直接返回，无需打开浏览器
+        cached_path = self.screenshot_cache.get("player", player_id)
+        if cached_path:
+            logger.info(f"命中截图缓存: {cached_path}")
+            return cached_path
+        
+        # 插件重载后从磁盘缓存恢复截图
+        target = os.path.join(self.screenshot_dir, f"player_stats_{player_id}_{int(time.time())}.png")
+        restored = await self.disk_cache.restore_file("player", str(player_id), target)
+        if restored:
+            path = await self.content_store.adopt(restored["path"], f"player_{player_id}")
+            logger.info(f"命中磁盘缓存: {path}")
+            self.screenshot_cache.put("player", player_id, path, created=restored["created"])
+            return path
+        
+        # 同一选手的并发查询合并为一次抓取，只有发起抓取的调用方占用准入名额
+        url = f"https://event.5eplay.com/csgo/player/csgo_pl_{player_id}"
+        key = SingleFlight.make_key(url, target=".player-detail-index")
+        capture = lambda: self._capture_player_stats(player_id, player_name)
+        return await self.single_flight.do(key, (lambda: admit(capture)) if admit else capture)
+    
+    async def _capture_player_stats(self, player_id: str, player_name: str) -> Optional[str]:
+        """打开选手页面并截图"""
         try:
-            # 导入playwright，确保已安装
-            from playwright.async_api import async_playwright
+            # 确保浏览器池已启动，未安装playwright时会抛出ImportError
+            await self.page_pool.start()
             
             # 生成截图文件路径
             screenshot_path = os.path.join(self.screenshot_dir, f"player_stats_{player_id}_{int(time.time())}.png")
             logger.debug(f"截图保存路径: {screenshot_path}")
             
-            # 配置浏览器启动参数
-            browser_args = [
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-            logger.debug(f"浏览器启动参数: {browser_args}")
-            
             # 重试机制
             max_retries = 3
             retry_delay = 2
@@ -212,59 +247,14 @@ class PlayerSearcher:
                 try:
                     logger.info(f"第 {attempt + 1}/{max_retries} 次尝试获取选手数据")
                     
-                    async with async_playwright() as p:
-                        # 随机选择一个用户代理
-                        user_agent = random.choice(USER_AGENTS)
-                        logger.debug(f"使用的User-Agent: {user_agent}")
-                        
-                        logger.debug("启动浏览器...")
-                        browser = await p.chromium.launch(
-                            headless=True,
-                            args=browser_args
-                        )
-                        
-                        logger.debug("创建浏览器上下文...")
-                        context = await browser.new_context(
-                            viewport={'width': 1920, 'height': 1080},
-                            user_agent=user_agent,
-                            ignore_https_errors=True,
-                            accept_downloads=True,
-                            java_script_enabled=True,
-                            bypass_csp=True,
-                            extra_http_headers={
-                                'Accept': '*/*',
-                                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                                'Accept-Encoding': 'gzip, deflate, br',
-                                'Connection': 'keep-alive',
-                            }
-                        )
-                        
-                        logger.debug("创建新页面...")
-                        page = await context.new_page()
-                        
-                        # 添加反爬虫脚本
-                        logger.debug("添加反爬虫脚本...")
-                        await page.add_init_script("""
-                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                            window.localStorage.setItem('CookieConsent', JSON.stringify({
-                                accepted: true,
-                                necessary: true,
-                                preferences: true,
-                                statistics: true,
-                                marketing: true
-                            }));
-                        """)
-                        
-                        # 设置超时
-                        page.set_default_timeout(60000)
-                        
+                    logger.debug("从页面池获取预热页面...")
+                    async with self.page_pool.page("player") as page:
                         # 访问页面
                         url = f"https://event.5eplay.com/csgo/player/csgo_pl_{player_id}"
                         logger.info(f"第 {attempt + 1} 次尝试访问URL: {url}")
                         
-                        # 延迟
-                        await asyncio.sleep(random.uniform(1.0, 2.0))
-                        logger.debug(f"延迟后开始导航...")
+                        # 可选的反爬虫随机延迟，默认关闭
+                        await self.readiness.jitter.pause()
                         
                         response = await page.goto(url, wait_until="domcontentloaded")
                         
@@ -273,26 +263,39 @@ class PlayerSearcher:
                             logger.info(f"页面响应状态码: {response.status}")
                             
                             if response.status == 200:
-                                # 等待页面加载
-                                logger.debug("等待页面加载完成...")
-                                await page.wait_for_load_state("networkidle")
-                                await asyncio.sleep(random.uniform(1.0, 2.0))
+                                # 等待"数据"标签出现
+                                data_tab_selector = 'ul.sub-tab-wrap.flex-horizontal li:text("数据")'
+                                logger.debug("等待'数据'标签出现...")
+                                await self.readiness.wait_for_selector(page, data_tab_selector)
                                 
                                 # 查找并点击"数据"标签
                                 logger.debug("尝试查找并点击'数据'标签...")
-                                data_tab = await page.query_selector('ul.sub-tab-wrap.flex-horizontal li:text("数据")')
+                                data_tab = await page.query_selector(data_tab_selector)
                                 if data_tab:
                                     logger.debug("找到'数据'标签，准备点击")
                                     # 模拟点击
                                     await data_tab.hover()
-                                    await asyncio.sleep(random.uniform(0.3, 0.8))
+                                    await self.readiness.jitter.pause(0.4)
                                     await data_tab.click()
                                     logger.debug("已点击'数据'标签")
                                     
                                     # 等待数据加载
                                     logger.debug("等待数据内容加载...")
-                                    await page.wait_for_selector('.player-detail-index', state="visible", timeout=15000)
-                                    await asyncio.sleep(random.uniform(1.0, 2.0))
+                                    fingerprint = None
+                                    if await self.readiness.wait_for_selector(page, '.player-detail-index'):
+                                        # 等待数据区域渲染完成
+                                        await self.readiness.wait_for_dom_stable(page, '.player-detail-index')
+                                        
+                                        # 数据文字与上次截图时相同则复用上次的截图，跳过等待图片、截图和编码
+                                        fingerprint = text_fingerprint(await page.evaluate(ELEMENT_TEXT_SCRIPT, '.player-detail-index'))
+                                        reused = self.screenshot_cache.revalidate("player", player_id, fingerprint)
+                                        if reused:
+                                            logger.info(f"{player_name} 的数据没有变化，复用上次的截图: {reused}")
+                                            await self.disk_cache.put_file("player", str(player_id), reused,
+                                                                           ttl=self.screenshot_cache.ttl_for("player"))
+                                            return reused
+                                        
+                                        await self.readiness.wait_for_images(page, '.player-detail-index')
                                     
                                     # 隐藏页面顶部元素
                                     logger.debug("隐藏顶部元素(header-box和sub-header)...")
@@ -324,8 +327,8 @@ class PlayerSearcher:
                                     """)
                                     logger.debug("页面顶部和底部元素已隐藏")
                                     
-                                    # 强制等待一下，确保样式应用
-                                    await asyncio.sleep(0.5)
+                                    # 等待下一帧绘制，确保样式应用
+                                    await self.readiness.wait_for_paint(page)
                                     
                                     # 检查数据是否实际加载
                                     logger.debug("检查数据是否已加载...")
@@ -348,6 +351,10 @@ class PlayerSearcher:
                                             logger.debug(f"截图文件大小: {file_size} 字节")
                                             if file_size > 0:
                                                 logger.info("截图成功完成")
+                                                screenshot_path = await self.content_store.adopt(screenshot_path, f"player_{player_id}")
+                                                self.screenshot_cache.put("player", player_id, screenshot_path, fingerprint=fingerprint)
+                                                await self.disk_cache.put_file("player", str(player_id), screenshot_path,
+                                                                               ttl=self.screenshot_cache.ttl_for("player"))
                                                 return screenshot_path
                                             else:
                                                 logger.warning(f"截图文件大小为零: {screenshot_path}")
@@ -361,16 +368,12 @@ class PlayerSearcher:
                                 logger.warning(f"页面返回非200状态码: {response.status}")
                         else:
                             logger.warning("没有收到页面响应")
-                        
-                        # 关闭浏览器
-                        logger.debug("关闭浏览器...")
-                        await browser.close()
-                        
-                        # 如果失败且不是最后一次尝试，则等待后重试
-                        if attempt < max_retries - 1:
-                            retry_time = retry_delay * (attempt + 1)
-                            logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
-                            await asyncio.sleep(retry_time)
+                    
+                    # 如果失败且不是最后一次尝试，则等待后重试
+                    if attempt < max_retries - 1:
+                        retry_time = retry_delay * (attempt + 1)
+                        logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
+                        await asyncio.sleep(retry_time)
                     
                 except Exception as e:
                     logger.error(f"第 {attempt + 1} 次尝试出错: {str(e)}", exc_info=True)
@@ -387,6 +390,65 @@ class PlayerSearcher:
             logger.error(f"获取选手数据时出错: {str(e)}", exc_info=True)
             return None
     
+    async def get_player_data(self, player_id: str, player_name: str, admit: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
+        """获取选手统计数据的文字版本，不截图，admit用于包装实时抓取"""
+        logger.info(f"开始提取选手 {player_name}(ID:{player_id}) 的统计数据")
+        
+        # 磁盘缓存中有仍然有效的数据时直接返回
+        cached = await self.disk_cache.get_json("player_data", str(player_id))
+        if cached:
+            logger.info(f"命中磁盘缓存: {player_name} 的文字数据")
+            return cached["value"]
+        
+        url = f"https://event.5eplay.com/csgo/player/csgo_pl_{player_id}"
+        key = SingleFlight.make_key(url, target=".player-detail-index", mode="data")
+        extract = lambda: self._extract_player_data(player_id, player_name)
+        return await self.single_flight.do(key, (lambda: admit(extract)) if admit else extract)
+    
+    async def _extract_player_data(self, player_id: str, player_name: str) -> Optional[Dict[str, Any]]:
+        """打开选手页面，一次evaluate提取统计数据"""
+        try:
+            await self.page_pool.start()
+            
+            async with self.page_pool.page("player") as page:
+                url = f"https://event.5eplay.com/csgo/player/csgo_pl_{player_id}"
+                await self.readiness.jitter.pause()
+                response = await page.goto(url, wait_until="domcontentloaded")
+                if not response or response.status != 200:
+                    logger.warning(f"页面响应异常: {response.status if response else '无响应'}")
+                    return None
+                
+                # 切换到"数据"标签
+                data_tab_selector = 'ul.sub-tab-wrap.flex-horizontal li:text("数据")'
+                if not await self.readiness.wait_for_selector(page, data_tab_selector):
+                    logger.error("未找到'数据'标签")
+                    return None
+                data_tab = await page.query_selector(data_tab_selector)
+                await data_tab.click()
+                
+                if not await self.readiness.wait_for_selector(page, '.player-detail-index'):
+                    logger.error("未找到数据元素 .player-detail-index")
+                    return None
+                
+                # 只需等待数据渲染完成，不等待图片
+                await self.readiness.wait_for_dom_stable(page, '.player-detail-index')
+                raw = await page.evaluate(EXTRACT_STATS_SCRIPT, '.player-detail-index')
+            
+            data = build_player_data(player_id, player_name, raw)
+            if not has_stats(data):
+                logger.warning(f"未能从页面中解析出 {player_name} 的数据")
+                return None
+            logger.info(f"已提取 {player_name} 的 {len(data['stats'])} 项统计数据")
+            await self.disk_cache.put_json("player_data", str(player_id), data, ttl=self.screenshot_cache.ttl_for("player"))
+            return data
+            
+        except ImportError:
+            logger.error("未安装playwright，请使用pip install playwright安装")
+            return None
+        except Exception as e:
+            logger.error(f"提取选手数据失败: {str(e)}", exc_info=True)
+            return None
+    
     async def help_cmd(self) -> Dict[str, str]:
         """显示帮助信息"""
         help_text = "🎮 CS:GO 选手数据查询系统 🎮\n" + "═" * 30 + "\n\n"
@@ -1,58 +1,126 @@
 import os
 import asyncio
-import random
 import time
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from PIL import Image
 import io
 
+try:
+    from .page_pool import PagePool
+    from .page_ready import PageReadiness
+    from .single_flight import SingleFlight
+    from .image_workers import ImageWorkerPool
+    from .stale_cache import StaleCache
+    from .match_result import MATCH_LIST_SCRIPT, MATCH_LIST_ARGS, parse_match_rows
+    from .disk_cache import DiskCache
+    from .content_store import ContentStore
+except ImportError:
+    from page_pool import PagePool
+    from page_ready import PageReadiness
+    from single_flight import SingleFlight
+    from image_workers import ImageWorkerPool
+    from stale_cache import StaleCache
+    from match_result import MATCH_LIST_SCRIPT, MATCH_LIST_ARGS, parse_match_rows
+    from disk_cache import DiskCache
+    from content_store import ContentStore
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('recent_match')
 
-# 用户代理列表，用于反爬虫
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-]
-
 class RecentMatchFetcher:
     """CS:GO 最近比赛查询类"""
     
-    def __init__(self):
+    def __init__(self, page_pool: Optional[PagePool] = None,
+                 readiness: Optional[PageReadiness] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 image_workers: Optional[ImageWorkerPool] = None,
+                 stale_cache: Optional[StaleCache] = None,
+                 disk_cache: Optional[DiskCache] = None,
+                 content_store: Optional[ContentStore] = None):
         """初始化查询器"""
+        # 共享的页面池，未传入时使用独立的页面池
+        self.page_pool = page_pool or PagePool()
+        # 页面就绪等待策略
+        self.readiness = readiness or PageReadiness()
+        # 合并并发的相同抓取
+        self.single_flight = single_flight or SingleFlight()
+        # 图片合成在线程池中执行，不阻塞事件循环
+        self.image_workers = image_workers or ImageWorkerPool()
+        # 最近比赛快照（比赛列表和截图）先返回旧数据再后台刷新
+        self.stale_cache = stale_cache or StaleCache()
+        # 插件重载后仍然有效的快照缓存
+        self.disk_cache = disk_cache or DiskCache(os.path.join(os.path.dirname(__file__), "cache"))
+        
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir, exist_ok=True)
+        # 截图按内容哈希命名，内容相同的截图只保留一份
+        self.content_store = content_store or ContentStore(self.screenshot_dir)
     
     async def get_recent_matches(self) -> Optional[str]:
         """获取最近比赛数据并截图"""
+        snapshot = await self.get_recent_snapshot()
+        return snapshot["image_path"] if snapshot else None
+    
+    async def get_recent_snapshot(self) -> Optional[Dict[str, Any]]:
+        """获取最近比赛快照，包含比赛列表和拼接后的截图"""
         logger.info("开始获取最近比赛数据")
         
+        # 并发的最近比赛查询合并为一次抓取
+        key = SingleFlight.make_key("https://event.5eplay.com/csgo/matches", target="recent_collage", limit=10)
+        return await self.single_flight.do(key, self._capture_recent_matches)
+    
+    @staticmethod
+    def _valid_snapshot(snapshot: Optional[Dict[str, Any]]) -> bool:
+        """截图文件仍然存在的快照才能使用"""
+        return bool(snapshot) and os.path.exists(snapshot["image_path"])
+    
+    async def get_recent_matches_cached(self, admit=None) -> Tuple[Optional[str], float]:
+        """返回最近比赛截图和数据年龄，缓存超过软期限时在后台刷新，admit用于包装实时抓取"""
+        if self.stale_cache.peek("recent_matches", self._valid_snapshot) is None:
+            await self._restore_snapshot()
+        snapshot, age = await self.stale_cache.get(
+            "recent_matches", self.get_recent_snapshot, admit=admit, valid=self._valid_snapshot
+        )
+        return (snapshot["image_path"] if snapshot else None), age
+    
+    async def _persist_snapshot(self, snapshot: Dict[str, Any]):
+        """将快照写入磁盘缓存，有效期与缓存的硬过期时间一致"""
+        ttl = self.stale_cache.hard_ttl
+        await self.disk_cache.put_json("recent_matches", "latest", snapshot["rows"], ttl=ttl)
+        await self.disk_cache.put_file("recent_matches", "latest", snapshot["image_path"], ttl=ttl)
+    
+    async def _restore_snapshot(self):
+        """插件重载后从磁盘缓存恢复最近一次的快照"""
+        rows = await self.disk_cache.get_json("recent_matches", "latest")
+        if not rows:
+            return
+        target = os.path.join(self.screenshot_dir, f"recent_matches_{int(rows['created'])}.png")
+        image = await self.disk_cache.restore_file("recent_matches", "latest", target)
+        if image:
+            path = await self.content_store.adopt(image["path"], "recent_matches")
+            logger.info(f"从磁盘缓存恢复最近比赛快照: {path}")
+            self.stale_cache.put("recent_matches", {"image_path": path, "rows": rows["value"]},
+                                 fetched_at=image["created"])
+    
+    def refresh_recent_matches(self) -> Optional[asyncio.Task]:
+        """在后台刷新缓存的最近比赛快照，已在刷新时返回None"""
+        return self.stale_cache.refresh("recent_matches", self.get_recent_snapshot, self._valid_snapshot)
+    
+    async def _capture_recent_matches(self) -> Optional[Dict[str, Any]]:
+        """打开比赛页面并拼接最近比赛截图"""
         try:
-            # 导入playwright，确保已安装
-            from playwright.async_api import async_playwright
+            # 确保浏览器池已启动，未安装playwright时会抛出ImportError
+            await self.page_pool.start()
             
             # 生成截图文件路径
             screenshot_path = os.path.join(self.screenshot_dir, f"recent_matches_{int(time.time())}.png")
             logger.debug(f"最终截图保存路径: {screenshot_path}")
             
-            # 临时截图存储
-            temp_screenshots = []
-            
-            # 配置浏览器启动参数
-            browser_args = [
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-            logger.debug(f"浏览器启动参数: {browser_args}")
+            # 各元素截图的PNG数据，只保存在内存中
+            screenshots: List[bytes] = []
             
             # 重试机制
             max_retries = 3
@@ -63,59 +131,14 @@ class RecentMatchFetcher:
                 try:
                     logger.info(f"第 {attempt + 1}/{max_retries} 次尝试获取比赛数据")
                     
-                    async with async_playwright() as p:
-                        # 随机选择一个用户代理
-                        user_agent = random.choice(USER_AGENTS)
-                        logger.debug(f"使用的User-Agent: {user_agent}")
-                        
-                        logger.debug("启动浏览器...")
-                        browser = await p.chromium.launch(
-                            headless=True,
-                            args=browser_args
-                        )
-                        
-                        logger.debug("创建浏览器上下文...")
-                        context = await browser.new_context(
-                            viewport={'width': 1280, 'height': 900},
-                            user_agent=user_agent,
-                            ignore_https_errors=True,
-                            accept_downloads=True,
-                            java_script_enabled=True,
-                            bypass_csp=True,
-                            extra_http_headers={
-                                'Accept': '*/*',
-                                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                                'Accept-Encoding': 'gzip, deflate, br',
-                                'Connection': 'keep-alive',
-                            }
-                        )
-                        
-                        logger.debug("创建新页面...")
-                        page = await context.new_page()
-                        
-                        # 添加反爬虫脚本
-                        logger.debug("添加反爬虫脚本...")
-                        await page.add_init_script("""
-                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                            window.localStorage.setItem('CookieConsent', JSON.stringify({
-                                accepted: true,
-                                necessary: true,
-                                preferences: true,
-                                statistics: true,
-                                marketing: true
-                            }));
-                        """)
-                        
-                        # 设置超时
-                        page.set_default_timeout(60000)
-                        
+                    logger.debug("从页面池获取预热页面...")
+                    async with self.page_pool.page("recent_match") as page:
                         # 访问页面
                         url = "https://event.5eplay.com/csgo/matches"
                         logger.info(f"第 {attempt + 1} 次尝试访问URL: {url}")
                         
-                        # 延迟
-                        await asyncio.sleep(random.uniform(1.0, 2.0))
-                        logger.debug(f"延迟后开始导航...")
+                        # 可选的反爬虫随机延迟，默认关闭
+                        await self.readiness.jitter.pause()
                         
                         response = await page.goto(url, wait_until="domcontentloaded")
                         
@@ -124,10 +147,11 @@ class RecentMatchFetcher:
                             logger.info(f"页面响应状态码: {response.status}")
                             
                             if response.status == 200:
-                                # 等待页面加载
-                                logger.debug("等待页面加载完成...")
-                                await page.wait_for_load_state("networkidle")
-                                await asyncio.sleep(random.uniform(1.0, 2.0))
+                                # 等待比赛列表渲染完成
+                                logger.debug("等待比赛列表加载...")
+                                if await self.readiness.wait_for_selector(page, '.match-item-row.cp'):
+                                    await self.readiness.wait_for_dom_stable(page)
+                                    await self.readiness.wait_for_images(page, '.match-item-row.cp')
                                 
                                 # 隐藏页面顶部元素
                                 logger.debug("隐藏顶部元素...")
@@ -152,8 +176,8 @@ class RecentMatchFetcher:
                                 """)
                                 logger.debug("页面顶部和底部元素已隐藏")
                                 
-                                # 强制等待一下，确保样式应用
-                                await asyncio.sleep(0.5)
+                                # 等待下一帧绘制，确保样式应用
+                                await self.readiness.wait_for_paint(page)
                                 
                                 # 查找所有的比赛元素
                                 logger.debug("查找比赛元素...")
@@ -163,9 +187,7 @@ class RecentMatchFetcher:
                                 if first_title:
                                     logger.debug("找到第一个日期标题")
                                     # 截图第一个日期标题
-                                    first_title_path = os.path.join(self.screenshot_dir, f"title_0_{int(time.time())}.png")
-                                    await first_title.screenshot(path=first_title_path)
-                                    temp_screenshots.append(first_title_path)
+                                    screenshots.append(await first_title.screenshot())
                                 else:
                                     logger.warning("未找到日期标题")
                                     
@@ -178,6 +200,9 @@ class RecentMatchFetcher:
                                     match_count = min(len(match_items), 10)
                                     logger.debug(f"将显示前 {match_count} 场比赛")
                                     
+                                    # 一次读取比赛列表的结构化数据，与截图一起保存
+                                    rows = parse_match_rows(await page.evaluate(MATCH_LIST_SCRIPT, MATCH_LIST_ARGS))[:match_count]
+                                    
                                     for i in range(match_count):
                                         # 获取当前比赛元素
                                         match_item = match_items[i]
@@ -203,7 +228,6 @@ class RecentMatchFetcher:
                                                 """, match_item)
                                                 
                                                 if date_title:
-                                                    title_path = os.path.join(self.screenshot_dir, f"title_{i+1}_{int(time.time())}.png")
                                                     # 错误处理: 移除下面的evaluate调用，因为参数太多
                                                     # await page.evaluate("""
                                                     #     (element, path) => {
@@ -215,47 +239,22 @@ class RecentMatchFetcher:
                                                     # 截图日期标题
                                                     date_title_element = await page.query_selector(f".match-time-title:nth-of-type({i+1})")
                                                     if date_title_element:
-                                                        await date_title_element.screenshot(path=title_path)
-                                                        temp_screenshots.append(title_path)
+                                                        screenshots.append(await date_title_element.screenshot())
                                         
                                         # 截图比赛条目
-                                        match_path = os.path.join(self.screenshot_dir, f"match_{i}_{int(time.time())}.png")
-                                        await match_item.screenshot(path=match_path)
-                                        temp_screenshots.append(match_path)
+                                        screenshots.append(await match_item.screenshot())
                                         
                                     # 处理完所有元素后，合并图片
                                     logger.info("开始合并截图...")
-                                    if temp_screenshots:
-                                        # 打开所有图片
-                                        images = [Image.open(img_path) for img_path in temp_screenshots]
-                                        
-                                        # 计算合并后图片的总高度和最大宽度
-                                        total_height = sum(img.height for img in images)
-                                        max_width = max(img.width for img in images)
-                                        
-                                        # 创建新图片
-                                        merged_image = Image.new('RGB', (max_width, total_height), color=(255, 255, 255))
-                                        
-                                        # 合并图片
-                                        y_offset = 0
-                                        for img in images:
-                                            merged_image.paste(img, (0, y_offset))
-                                            y_offset += img.height
-                                            img.close()  # 关闭图片以释放资源
-                                        
-                                        # 保存合并后的图片
-                                        merged_image.save(screenshot_path)
-                                        merged_image.close()
-                                        
-                                        # 删除临时截图
-                                        for img_path in temp_screenshots:
-                                            try:
-                                                os.remove(img_path)
-                                            except Exception as e:
-                                                logger.error(f"删除临时截图出错: {str(e)}")
+                                    if screenshots:
+                                        # 在内存中合并，只写入最终图片
+                                        await self.image_workers.run(self.merge_screenshots, screenshots, screenshot_path)
+                                        screenshot_path = await self.content_store.adopt(screenshot_path, "recent_matches")
                                         
                                         logger.info(f"成功合并截图到 {screenshot_path}")
-                                        return screenshot_path
+                                        snapshot = {"image_path": screenshot_path, "rows": rows}
+                                        await self._persist_snapshot(snapshot)
+                                        return snapshot
                                     else:
                                         logger.warning("没有可合并的截图")
                                 else:
@@ -264,16 +263,12 @@ class RecentMatchFetcher:
                                 logger.warning(f"页面返回非200状态码: {response.status}")
                         else:
                             logger.warning("没有收到页面响应")
-                        
-                        # 关闭浏览器
-                        logger.debug("关闭浏览器...")
-                        await browser.close()
-                        
-                        # 如果失败且不是最后一次尝试，则等待后重试
-                        if attempt < max_retries - 1:
-                            retry_time = retry_delay * (attempt + 1)
-                            logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
-                            await asyncio.sleep(retry_time)
+                    
+                    # 如果失败且不是最后一次尝试，则等待后重试
+                    if attempt < max_retries - 1:
+                        retry_time = retry_delay * (attempt + 1)
+                        logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
+                        await asyncio.sleep(retry_time)
                     
                 except Exception as e:
                     logger.error(f"第 {attempt + 1} 次尝试出错: {str(e)}", exc_info=True)
@@ -288,22 +283,38 @@ class RecentMatchFetcher:
             return None
         except Exception as e:
             logger.error(f"获取比赛数据时出错: {str(e)}", exc_info=True)
-            # 清理可能遗留的临时截图
-            for img_path in temp_screenshots:
-                try:
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                except:
-                    pass
             return None
     
+    def merge_screenshots(self, screenshots: List[bytes], output_path: str):
+        """将多张PNG截图纵向拼接并保存，在图片线程池中执行"""
+        # 打开所有图片
+        images = [Image.open(io.BytesIO(data)) for data in screenshots]
+        
+        # 计算合并后图片的总高度和最大宽度
+        total_height = sum(img.height for img in images)
+        max_width = max(img.width for img in images)
+        
+        # 创建新图片
+        merged_image = Image.new('RGB', (max_width, total_height), color=(255, 255, 255))
+        
+        # 合并图片
+        y_offset = 0
+        for img in images:
+            merged_image.paste(img, (0, y_offset))
+            y_offset += img.height
+            img.close()  # 关闭图片以释放资源
+        
+        # 保存合并后的图片
+        merged_image.save(output_path)
+        merged_image.close()
+    
     async def process_command(self, command: str) -> Dict[str, Any]:
         """处理最近比赛命令"""
         if command.strip() in ["最近比赛", "/最近比赛"]:
             try:
                 # 获取最近比赛数据
                 logger.info("开始获取最近比赛数据")
-                screenshot_path = await self.get_recent_matches()
+                screenshot_path, _ = await self.get_recent_matches_cached()
                 
                 if (screenshot_path and os.path.exists(screenshot_path)):
                     logger.info(f"成功获取最近比赛数据，截图保存在 {screenshot_path}")
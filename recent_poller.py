@@ -0,0 +1,111 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    from .recent_match import RecentMatchFetcher
+except ImportError:
+    from recent_match import RecentMatchFetcher
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('recent_poller')
+
+class RecentMatchPoller:
+    """定期在后台刷新最近比赛快照，长时间没有查询时逐步拉长刷新间隔"""
+
+    def __init__(self, fetcher: RecentMatchFetcher, interval: int = 45, idle_after: int = 1800,
+                 max_interval: int = 1800, hard_ttl: Optional[float] = None):
+        """初始化轮询任务，hard_ttl为快照缓存的硬过期时间"""
+        self.fetcher = fetcher
+        self.interval = max(10, int(interval))
+        # 超过该时间没有查询即视为空闲，开始退避
+        self.idle_after = idle_after
+        self.max_interval = max(self.interval, int(max_interval))
+        # 退避后的间隔需短于硬过期时间，否则空闲后的第一次查询仍要等待实时抓取
+        if hard_ttl is not None and self.max_interval > hard_ttl - self.interval:
+            self.max_interval = max(self.interval, int(hard_ttl) - self.interval)
+            logger.info(f"最长刷新间隔超过快照缓存的硬过期时间，调整为 {self.max_interval} 秒")
+
+        self.current_interval = self.interval
+        self.last_request = time.monotonic()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.polls = 0
+        self.failures = 0
+        self.skipped = 0
+
+    def touch(self):
+        """记录一次查询，处于退避状态时立即恢复正常刷新"""
+        self.last_request = time.monotonic()
+        if self.current_interval != self.interval:
+            logger.info("收到最近比赛查询，恢复正常刷新间隔")
+            self.current_interval = self.interval
+            self._wake.set()
+
+    def _next_interval(self) -> int:
+        """计算下一次刷新前的等待时间"""
+        if time.monotonic() - self.last_request > self.idle_after:
+            self.current_interval = min(self.max_interval, self.current_interval * 2)
+        else:
+            self.current_interval = self.interval
+        return self.current_interval
+
+    async def poll(self):
+        """刷新一次快照并等待完成，只有成功的刷新计入polls"""
+        task = self.fetcher.refresh_recent_matches()
+        if task is None:
+            # 已有刷新在进行（例如查询触发的刷新）
+            return
+        refreshed = await task
+        if refreshed:
+            self.polls += 1
+        elif refreshed is None:
+            # 后台任务排队已满
+            self.skipped += 1
+        else:
+            self.failures += 1
+
+    async def _run(self):
+        """后台定期刷新"""
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"刷新最近比赛快照出错: {str(e)}")
+
+            interval = self._next_interval()
+            if interval != self.interval:
+                logger.debug(f"最近比赛长时间无人查询，{interval} 秒后再刷新")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """启动后台轮询，需要在事件循环中调用"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """停止后台轮询"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回轮询统计"""
+        return {
+            "polls": self.polls,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "interval": self.current_interval,
+            "idle_seconds": int(time.monotonic() - self.last_request),
+        }
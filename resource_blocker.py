@@ -0,0 +1,84 @@
+import re
+import logging
+from typing import Dict, List, Optional, Any
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('resource_blocker')
+
+# 常见的广告和统计脚本地址
+TRACKER_PATTERNS = [
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+    r"googlesyndication\.com",
+    r"hm\.baidu\.com",
+    r"cnzz\.com",
+    r"umeng\.com",
+    r"growingio\.com",
+    r"sensorsdata",
+    r"hotjar\.com",
+    r"facebook\.net",
+]
+
+# 各类查询默认的拦截规则
+# 需要截图的页面保留图片和字体，保证队标、头像和图标正常显示
+DEFAULT_BLOCK_RULES = {
+    "player": {"block_types": ["media"], "deny_patterns": TRACKER_PATTERNS, "allow_patterns": []},
+    "team": {"block_types": ["media"], "deny_patterns": TRACKER_PATTERNS, "allow_patterns": []},
+    "recent_match": {"block_types": ["media"], "deny_patterns": TRACKER_PATTERNS, "allow_patterns": []},
+    # 比赛结果列表只提取文字，图片和字体都不需要
+    "match_result": {"block_types": ["image", "media", "font"], "deny_patterns": TRACKER_PATTERNS, "allow_patterns": []},
+    "match_detail": {"block_types": ["media"], "deny_patterns": TRACKER_PATTERNS, "allow_patterns": []},
+}
+
+class ResourceBlockPolicy:
+    """按资源类型和URL规则拦截页面请求"""
+
+    def __init__(self, block_types: Optional[List[str]] = None,
+                 deny_patterns: Optional[List[str]] = None,
+                 allow_patterns: Optional[List[str]] = None):
+        """初始化拦截规则"""
+        self.block_types = set(block_types or [])
+        self.deny_patterns = [re.compile(p) for p in (deny_patterns or [])]
+        # 白名单优先于其他规则
+        self.allow_patterns = [re.compile(p) for p in (allow_patterns or [])]
+        self.blocked = 0
+        self.allowed = 0
+
+    @classmethod
+    def from_config(cls, profile: str, config: Optional[Dict[str, Any]] = None) -> "ResourceBlockPolicy":
+        """根据默认规则和插件配置创建拦截规则"""
+        rules = dict(DEFAULT_BLOCK_RULES.get(profile, {}))
+        for key, value in (config or {}).items():
+            if key in ("block_types", "deny_patterns", "allow_patterns") and value is not None:
+                rules[key] = value
+        return cls(**rules)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """判断请求是否应被拦截"""
+        if any(p.search(url) for p in self.allow_patterns):
+            return False
+        if any(p.search(url) for p in self.deny_patterns):
+            return True
+        return resource_type in self.block_types
+
+    async def install(self, page):
+        """在页面上注册请求拦截"""
+        if not self.block_types and not self.deny_patterns:
+            return
+
+        async def handle_route(route):
+            request = route.request
+            if self.should_block(request.resource_type, request.url):
+                self.blocked += 1
+                await route.abort()
+            else:
+                self.allowed += 1
+                await route.continue_()
+
+        await page.route("**/*", handle_route)
+
+    def stats(self) -> Dict[str, int]:
+        """返回拦截统计"""
+        return {"blocked": self.blocked, "allowed": self.allowed}
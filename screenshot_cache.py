@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Any
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('screenshot_cache')
+
+class CacheEntry:
+    """一条截图缓存记录"""
+
+    def __init__(self, path: str, size: int, created: float, fingerprint: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.created = created
+        # 截图时数据区域文字的指纹
+        self.fingerprint = fingerprint
+
+class ScreenshotCache:
+    """按实体类型和ID缓存截图文件，带TTL和按字节数限制的LRU淘汰
+
+    过期的截图不会立即删除，重新打开页面后数据文字的指纹没有变化时可以继续使用。
+    截图按内容命名，同一个文件可能被多条记录引用或正在发送，缓存只移除记录，
+    不再被引用的文件由截图目录清理任务删除
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, int]] = None, default_ttl: int = 300,
+                 max_bytes: int = 200 * 1024 * 1024):
+        """初始化截图缓存"""
+        # 各实体类型的有效期（秒）
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def ttl_for(self, entity_type: str) -> int:
+        """返回实体类型对应的有效期"""
+        return self.ttls.get(entity_type, self.default_ttl)
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[str]:
+        """获取仍然有效的截图路径"""
+        key = (entity_type, str(entity_id))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if not os.path.exists(entry.path):
+            self._remove(key)
+            self.misses += 1
+            return None
+        if time.time() - entry.created > self.ttl_for(entity_type):
+            # 保留过期的截图，等待用指纹重新验证
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.path
+
+    def revalidate(self, entity_type: str, entity_id: str, fingerprint: Optional[str]) -> Optional[str]:
+        """数据指纹与缓存的截图一致时重新计时并返回截图路径"""
+        entry = self._entries.get((entity_type, str(entity_id)))
+        if entry is None or not fingerprint or entry.fingerprint != fingerprint or not os.path.exists(entry.path):
+            return None
+        entry.created = time.time()
+        self._entries.move_to_end((entity_type, str(entity_id)))
+        self.revalidated += 1
+        return entry.path
+
+    def put(self, entity_type: str, entity_id: str, path: str, created: Optional[float] = None,
+            fingerprint: Optional[str] = None):
+        """缓存一张新截图，created为截图的生成时间，默认为当前时间"""
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"无法读取截图文件大小，跳过缓存: {str(e)}")
+            return
+
+        key = (entity_type, str(entity_id))
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = CacheEntry(path, size, created or time.time(), fingerprint)
+        self.total_bytes += size
+        self._evict()
+
+    def _remove(self, key: Tuple[str, str]):
+        """移除缓存记录，文件留给截图目录清理任务删除"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+
+    def _evict(self):
+        """超出容量时按最近最少使用淘汰"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            logger.debug(f"截图缓存超出容量，淘汰 {key}: {entry.path}")
+            self._remove(key)
+
+    def paths(self) -> List[str]:
+        """返回缓存中所有截图的路径"""
+        return [entry.path for entry in list(self._entries.values())]
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
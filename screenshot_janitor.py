@@ -0,0 +1,119 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, Optional, Set, Any
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('screenshot_janitor')
+
+# 清理的文件类型
+IMAGE_EXTENSIONS = (".png", ".webp", ".jpg", ".jpeg")
+
+class ScreenshotJanitor:
+    """定期清理截图目录，按最长保存时间和总大小从最旧的文件开始删除"""
+
+    def __init__(self, directory: str, max_age: int = 24 * 3600, max_bytes: int = 500 * 1024 * 1024,
+                 interval: int = 600, grace: int = 120,
+                 protected: Optional[Callable[[], Iterable[str]]] = None):
+        """初始化清理任务"""
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = max(10, int(interval))
+        # 最近修改过的文件可能正在生成或发送，不清理
+        self.grace = grace
+        # 返回需要保留的文件路径，例如截图缓存中的文件
+        self.protected = protected
+
+        self._task: Optional[asyncio.Task] = None
+        self.reclaimed_bytes = 0
+        self.removed_files = 0
+
+    def _is_protected(self, path: str, roots: set) -> bool:
+        """缓存中的截图及其转换后的文件都需要保留"""
+        root = os.path.splitext(path)[0]
+        while root:
+            if root in roots:
+                return True
+            stripped = os.path.splitext(root)[0]
+            if stripped == root:
+                return False
+            root = stripped
+        return False
+
+    def protected_roots(self) -> Set[str]:
+        """收集需要保留的文件，需在事件循环中调用，避免与缓存的修改同时进行"""
+        return {os.path.splitext(os.path.abspath(p))[0] for p in (self.protected() if self.protected else [])}
+
+    def sweep(self, roots: Optional[Set[str]] = None) -> Dict[str, int]:
+        """执行一次清理，在线程池中调用，roots为事件循环中收集的需要保留的文件"""
+        now = time.time()
+        if roots is None:
+            roots = self.protected_roots()
+
+        files = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    st = entry.stat()
+                    total += st.st_size
+                    files.append((st.st_mtime, st.st_size, os.path.abspath(entry.path)))
+        except FileNotFoundError:
+            return {"removed": 0, "reclaimed": 0, "total": 0}
+
+        # 从最旧的文件开始
+        files.sort()
+        removed = 0
+        reclaimed = 0
+        for mtime, size, path in files:
+            age = now - mtime
+            expired = age > self.max_age
+            over_budget = total > self.max_bytes
+            if not expired and not over_budget:
+                break
+            if age < self.grace or self._is_protected(path, roots):
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除截图失败: {path}: {str(e)}")
+                continue
+            total -= size
+            removed += 1
+            reclaimed += size
+
+        self.removed_files += removed
+        self.reclaimed_bytes += reclaimed
+        if removed:
+            logger.info(f"已清理 {removed} 个截图文件，释放 {reclaimed / 1024 / 1024:.2f} MB，目录当前 {total / 1024 / 1024:.2f} MB")
+        return {"removed": removed, "reclaimed": reclaimed, "total": total}
+
+    async def _run(self):
+        """后台定期清理"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.sweep, self.protected_roots())
+            except Exception as e:
+                logger.error(f"清理截图目录出错: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """启动后台清理任务，需要在事件循环中调用"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """停止后台清理任务"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """返回清理统计"""
+        return {"removed_files": self.removed_files, "reclaimed_bytes": self.reclaimed_bytes}
@@ -0,0 +1,112 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('session_store')
+
+class SessionStore:
+    """各查询器共享的会话存储，按过期时间主动清理并限制总条目数"""
+
+    def __init__(self, default_ttl: float = 30, max_entries: int = 10000, sweep_interval: float = 5):
+        """初始化会话存储"""
+        self.default_ttl = default_ttl
+        self.max_entries = max(1, int(max_entries))
+        self.sweep_interval = sweep_interval
+
+        # (命名空间, 键) -> (值, 过期时间)，按写入顺序排列，超出容量时淘汰最早的
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[Any, float]]" = OrderedDict()
+        # 过期时间小顶堆，条目更新后旧的堆记录在弹出时跳过
+        self._heap: List[Tuple[float, int, Tuple[str, Hashable]]] = []
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+        self.expired = 0
+        self.evicted = 0
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入会话，覆盖已有的值并重新计时"""
+        full_key = (namespace, key)
+        expires = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        self._data.pop(full_key, None)
+        self._data[full_key] = (value, expires)
+        heapq.heappush(self._heap, (expires, next(self._seq), full_key))
+
+        while len(self._data) > self.max_entries:
+            old_key, _ = self._data.popitem(last=False)
+            self.evicted += 1
+            logger.debug(f"会话存储已满，淘汰 {old_key}")
+        # 堆中无效记录过多时重建
+        if len(self._heap) > 2 * len(self._data) + 64:
+            self._rebuild_heap()
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """读取仍然有效的会话"""
+        item = self._data.get((namespace, key))
+        if item is None:
+            return None
+        value, expires = item
+        if expires <= time.monotonic():
+            del self._data[(namespace, key)]
+            self.expired += 1
+            return None
+        return value
+
+    def _rebuild_heap(self):
+        """只保留仍然有效的堆记录"""
+        self._heap = [(expires, next(self._seq), full_key) for full_key, (_, expires) in self._data.items()]
+        heapq.heapify(self._heap)
+
+    def expire(self) -> int:
+        """清理所有已过期的会话，返回清理数量"""
+        now = time.monotonic()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires, _, full_key = heapq.heappop(self._heap)
+            item = self._data.get(full_key)
+            # 已被覆盖或删除的条目只是旧的堆记录
+            if item is not None and item[1] == expires:
+                del self._data[full_key]
+                removed += 1
+        self.expired += removed
+        return removed
+
+    async def _run(self):
+        """后台定期清理过期会话"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.expire()
+            if removed:
+                logger.debug(f"清理了 {removed} 个过期会话，当前 {len(self._data)} 个")
+
+    def start(self):
+        """启动后台清理任务，需要在事件循环中调用"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """停止后台清理任务"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回各命名空间的会话数量和清理统计"""
+        namespaces: Dict[str, int] = {}
+        for namespace, _ in self._data:
+            namespaces[namespace] = namespaces.get(namespace, 0) + 1
+        return {
+            "entries": len(self._data),
+            "namespaces": namespaces,
+            "heap": len(self._heap),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
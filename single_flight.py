@@ -0,0 +1,71 @@
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('single_flight')
+
+class Flight:
+    """一次正在进行的抓取"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.callers = 1
+
+class SingleFlight:
+    """合并并发的相同请求，同一时间每个请求只抓取一次"""
+
+    def __init__(self):
+        """初始化"""
+        self._flights: Dict[str, Flight] = {}
+        # 统计信息
+        self.flights = 0
+        self.callers = 0
+        self.max_callers = 0
+
+    @staticmethod
+    def make_key(url: str, **options) -> str:
+        """由URL和渲染参数生成规范化的请求键"""
+        url = url.strip().rstrip("/").lower()
+        if not options:
+            return url
+        return f"{url}|{json.dumps(options, sort_keys=True, ensure_ascii=False)}"
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行请求，已有相同请求在进行时等待其结果"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        else:
+            flight.callers += 1
+            logger.info(f"请求 {key} 正在进行中，合并为同一次抓取（当前 {flight.callers} 个调用方）")
+
+        # 使用shield，单个调用方取消不会影响其他等待者
+        return await asyncio.shield(flight.task)
+
+    def _finish(self, key: str, flight: Flight):
+        """请求完成后记录统计并移除"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        self.flights += 1
+        self.callers += flight.callers
+        self.max_callers = max(self.max_callers, flight.callers)
+        logger.info(f"请求 {key} 完成，共服务 {flight.callers} 个调用方")
+
+    def in_flight(self) -> int:
+        """当前正在进行的请求数"""
+        return len(self._flights)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回合并统计"""
+        return {
+            "in_flight": len(self._flights),
+            "flights": self.flights,
+            "callers": self.callers,
+            "saved_fetches": self.callers - self.flights,
+            "max_callers": self.max_callers,
+        }
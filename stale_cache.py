@@ -0,0 +1,167 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from .admission import AdmissionScheduler, AdmissionRejected
+except ImportError:
+    from admission import AdmissionScheduler, AdmissionRejected
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('stale_cache')
+
+Fetch = Callable[[], Awaitable[Any]]
+
+def describe_age(age: float) -> str:
+    """将数据年龄转换为易读的文字"""
+    if age < 5:
+        return "刚刚更新"
+    if age < 60:
+        return f"{int(age)}秒前更新"
+    if age < 3600:
+        return f"{int(age // 60)}分钟前更新"
+    return f"{int(age // 3600)}小时前更新"
+
+class StaleCache:
+    """先返回旧数据再后台刷新的缓存
+
+    软过期前直接返回缓存；软过期后、硬过期前仍返回缓存，同时在后台刷新；
+    硬过期后等待实时抓取
+    """
+
+    def __init__(self, soft_ttl: float = 60, hard_ttl: float = 600,
+                 scheduler: Optional[AdmissionScheduler] = None):
+        """初始化缓存"""
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(soft_ttl, hard_ttl)
+        # 后台刷新以低优先级经过准入调度，不与用户命令争抢浏览器
+        self.scheduler = scheduler
+
+        # 键 -> (值, 抓取时间)
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._refreshing: Set[str] = set()
+        # 缓存未命中时正在进行的实时抓取，同一个键的并发请求只抓取一次
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        # 统计信息
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def put(self, key: str, value: Any, fetched_at: Optional[float] = None):
+        """写入新抓取的数据，fetched_at为抓取时间，默认为当前时间"""
+        self._entries[key] = (value, fetched_at or time.time())
+
+    def peek(self, key: str, valid: Optional[Callable[[Any], bool]] = None) -> Optional[Tuple[Any, float]]:
+        """返回硬过期前的缓存数据和数据年龄（秒）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, fetched_at = entry
+        age = time.time() - fetched_at
+        if age >= self.hard_ttl or (valid and not valid(value)):
+            del self._entries[key]
+            return None
+        return value, age
+
+    async def get(self, key: str, fetch: Fetch, admit: Optional[Callable[[Fetch], Awaitable[Any]]] = None,
+                  valid: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, float]:
+        """返回数据和数据年龄，admit用于包装实时抓取，valid判断数据是否可以缓存"""
+        cached = self.peek(key, valid)
+        if cached is not None:
+            value, age = cached
+            if age < self.soft_ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                logger.info(f"{key} 的缓存已有 {int(age)} 秒，先返回旧数据并在后台刷新")
+                self.refresh(key, fetch, valid)
+            return value, age
+
+        self.misses += 1
+        loading = self._loading.get(key)
+        if loading is None:
+            # 只有发起实时抓取的请求经过admit，等待同一次抓取的请求不再占用准入名额
+            loading = asyncio.ensure_future(self._load(key, fetch, admit, valid))
+            self._loading[key] = loading
+            loading.add_done_callback(lambda _: self._finish_load(key, loading))
+        # 使用shield，单个请求取消不会影响其他等待者
+        value = await asyncio.shield(loading)
+        return value, 0.0
+
+    async def _load(self, key: str, fetch: Fetch, admit: Optional[Callable[[Fetch], Awaitable[Any]]],
+                    valid: Optional[Callable[[Any], bool]]) -> Any:
+        """缓存未命中时执行实时抓取并写入缓存"""
+        value = await (admit(fetch) if admit else fetch())
+        if valid is None or valid(value):
+            self.put(key, value)
+        return value
+
+    def _finish_load(self, key: str, loading: asyncio.Future):
+        """实时抓取结束后移除记录"""
+        if self._loading.get(key) is loading:
+            del self._loading[key]
+
+    def refresh(self, key: str, fetch: Fetch, valid: Optional[Callable[[Any], bool]] = None) -> Optional[asyncio.Task]:
+        """在后台刷新数据，同一个键同时只刷新一次，已在刷新时返回None，任务结果见_refresh"""
+        if key in self._refreshing:
+            return None
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, fetch, valid))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _refresh(self, key: str, fetch: Fetch, valid: Optional[Callable[[Any], bool]]) -> Optional[bool]:
+        """执行后台刷新，成功返回True，失败返回False，后台排队已满被跳过时返回None"""
+        try:
+            if self.scheduler:
+                value = await self.scheduler.background(key, fetch)
+            else:
+                value = await fetch()
+            if valid is None or valid(value):
+                self.put(key, value)
+                self.refreshes += 1
+                logger.info(f"{key} 的缓存已在后台刷新")
+                return True
+            self.refresh_failures += 1
+            logger.warning(f"{key} 的后台刷新没有得到有效数据，继续使用旧数据")
+            return False
+        except AdmissionRejected:
+            # 后台任务排队已满，下次请求时再尝试
+            logger.debug(f"{key} 的后台刷新被跳过，后台任务排队已满")
+            return None
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"{key} 的后台刷新出错: {str(e)}")
+            return False
+        finally:
+            self._refreshing.discard(key)
+
+    def paths(self) -> List[str]:
+        """返回缓存数据中引用的截图文件路径"""
+        return [value["image_path"] for value, _ in list(self._entries.values())
+                if isinstance(value, dict) and value.get("image_path")]
+
+    def stop(self):
+        """取消正在进行的后台刷新"""
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+        }
@@ -0,0 +1,192 @@
+import re
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('stats_extractor')
+
+# 一次evaluate取出数据区域内的统计项、队员和近期战绩
+EXTRACT_STATS_SCRIPT = """
+(selector) => {
+    const root = document.querySelector(selector);
+    if (!root) return null;
+    const text = node => (node && node.textContent || '').replace(/\\s+/g, ' ').trim();
+    const isValue = s => /^[-+]?\\d+(\\.\\d+)?%?$/.test(s);
+
+    // 数值叶子节点的标签只在它自己和父节点的相邻兄弟中查找，不搜索整个祖先子树
+    const labelOf = el => {
+        const s = text(el);
+        return s && !isValue(s) && s.length <= 12 ? s : null;
+    };
+    const stats = [];
+    const leaves = Array.from(root.querySelectorAll('*')).filter(el => !el.children.length);
+    for (const leaf of leaves) {
+        const value = text(leaf);
+        if (!isValue(value)) continue;
+        let label = null;
+        for (let node = leaf, depth = 0; node && node !== root && depth < 2 && !label; depth++, node = node.parentElement) {
+            label = labelOf(node.previousElementSibling) || labelOf(node.nextElementSibling);
+        }
+        if (label) stats.push({label, value});
+    }
+
+    // 队员链接
+    const roster = [];
+    const seen = new Set();
+    for (const a of root.querySelectorAll('a[href*="csgo_pl_"]')) {
+        const m = a.getAttribute('href').match(/csgo_pl_(\\d+)/);
+        const name = text(a);
+        if (m && name && !seen.has(m[1])) {
+            seen.add(m[1]);
+            roster.push({id: m[1], name});
+        }
+    }
+
+    // 近期比赛：比分取自比分单元格，没有比分单元格时只接受带胜负标记的行，避免把日期和时间当作比分
+    const form = [];
+    const scoreCell = /^(\\d{1,2})\\s*[:：-]\\s*(\\d{1,2})$/;
+    for (const row of root.querySelectorAll('[class*="match"], tr')) {
+        const line = text(row);
+        if (line.length > 80 || row.querySelector('[class*="match"]')) continue;
+        const cls = (row.className || '').toString().toLowerCase();
+        const result = /win|victory/.test(cls) ? 'W' : /lose|loss|defeat/.test(cls) ? 'L' : '';
+
+        let score = null;
+        const cells = Array.from(row.querySelectorAll('[class*="score"]'))
+            .filter(el => !el.children.length)
+            .map(text)
+            .filter(Boolean);
+        if (cells.length === 1) {
+            score = cells[0].match(scoreCell);
+        } else if (cells.length >= 2 && /^\\d{1,2}$/.test(cells[0]) && /^\\d{1,2}$/.test(cells[1])) {
+            score = [null, cells[0], cells[1]];
+        }
+        if (!score && result) {
+            score = line.match(/(?<![\\d:：\\-\\/.])(\\d{1,2})\\s*[:：-]\\s*(\\d{1,2})(?![\\d:：\\-\\/.])/);
+        }
+        if (!score) continue;
+        form.push({
+            text: line,
+            score: [parseInt(score[1]), parseInt(score[2])],
+            result
+        });
+        if (form.length >= 10) break;
+    }
+
+    return {stats, roster, form};
+}
+"""
+
+# 取出数据区域的文字内容，用于判断数据是否变化
+ELEMENT_TEXT_SCRIPT = """
+(selector) => {
+    const root = document.querySelector(selector);
+    return root ? root.innerText : '';
+}
+"""
+
+def text_fingerprint(text: str) -> Optional[str]:
+    """计算数据区域文字的指纹，忽略空白差异，没有文字时返回None"""
+    normalized = " ".join((text or "").split())
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+# 统计项标签到字段名的对应关系
+STAT_ALIASES = {
+    "rating": ("rating", "rating2.0", "rating 2.0", "评分"),
+    "adr": ("adr", "场均伤害", "平均伤害"),
+    "kast": ("kast", "kast%"),
+    "kd": ("kd", "k/d", "kd比"),
+    "kpr": ("kpr", "场均击杀", "每回合击杀"),
+    "headshot": ("hs", "hs%", "爆头率"),
+    "maps": ("maps", "地图数", "场次", "比赛场次"),
+    "win_rate": ("胜率", "win rate", "winrate"),
+}
+
+def parse_stat_value(value: str) -> Optional[float]:
+    """把页面上的数值文字转换为数字，百分比保留百分数"""
+    match = re.match(r"^\s*([-+]?\d+(?:\.\d+)?)\s*%?\s*$", value or "")
+    if not match:
+        return None
+    return float(match.group(1))
+
+def _normalize(raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """整理evaluate返回的原始数据"""
+    raw = raw or {}
+    stats: Dict[str, float] = {}
+    for item in raw.get("stats", []):
+        value = parse_stat_value(item.get("value"))
+        if value is not None and item.get("label") not in stats:
+            stats[item["label"]] = value
+
+    data: Dict[str, Any] = {}
+    lowered = {label.lower(): value for label, value in stats.items()}
+    for field, aliases in STAT_ALIASES.items():
+        data[field] = next((lowered[a] for a in aliases if a in lowered), None)
+    data["stats"] = stats
+    data["recent_form"] = raw.get("form", [])
+    return data
+
+def build_player_data(player_id: str, player_name: str, raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """生成选手数据字典"""
+    data = {"id": player_id, "name": player_name}
+    data.update(_normalize(raw))
+    return data
+
+def build_team_data(team_id: str, team_name: str, raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """生成战队数据字典"""
+    data = {"id": team_id, "name": team_name}
+    data.update(_normalize(raw))
+    data["roster"] = (raw or {}).get("roster", [])
+    return data
+
+def has_stats(data: Dict[str, Any]) -> bool:
+    """是否解析到了有效数据"""
+    return bool(data.get("stats") or data.get("roster") or data.get("recent_form"))
+
+def _format_value(field: str, value: float) -> str:
+    """格式化单个数值"""
+    if field in ("kast", "headshot", "win_rate"):
+        return f"{value:g}%"
+    return f"{value:g}"
+
+def _format_stats(data: Dict[str, Any], labels: Dict[str, str], limit: int = 8) -> List[str]:
+    """格式化统计项，没有识别出常用项时列出页面上的原始统计项"""
+    lines = [f"{label}: {_format_value(field, data[field])}" for field, label in labels.items() if data.get(field) is not None]
+    if not lines:
+        lines = [f"{label}: {value:g}" for label, value in list(data.get("stats", {}).items())[:limit]]
+    return lines
+
+def _format_form(form: List[Dict[str, Any]], limit: int = 5) -> List[str]:
+    """格式化近期战绩"""
+    lines = []
+    for item in form[:limit]:
+        prefix = f"[{item['result']}] " if item.get("result") else ""
+        lines.append(f"  {prefix}{item['text']}")
+    return lines
+
+def format_player_text(data: Dict[str, Any]) -> str:
+    """把选手数据格式化为文字回复"""
+    lines = [f"📊 {data['name']} 的数据：", "═" * 30]
+    labels = {"rating": "Rating", "adr": "ADR", "kast": "KAST", "kd": "K/D", "kpr": "KPR",
+              "headshot": "爆头率", "maps": "地图数"}
+    lines.extend(_format_stats(data, labels))
+    if data.get("recent_form"):
+        lines.append("\n近期比赛：")
+        lines.extend(_format_form(data["recent_form"]))
+    return "\n".join(lines)
+
+def format_team_text(data: Dict[str, Any]) -> str:
+    """把战队数据格式化为文字回复"""
+    lines = [f"📊 {data['name']} 的数据：", "═" * 30]
+    if data.get("roster"):
+        lines.append("队员: " + " / ".join(player["name"] for player in data["roster"]))
+    labels = {"rating": "Rating", "win_rate": "胜率", "maps": "地图数", "kd": "K/D"}
+    lines.extend(_format_stats(data, labels))
+    if data.get("recent_form"):
+        lines.append("\n近期比赛：")
+        lines.extend(_format_form(data["recent_form"]))
+    return "\n".join(lines)
@@ -1,42 +1,75 @@
 import os
 import re
 import asyncio
-import random
 import time
 from difflib import SequenceMatcher
 import logging
-from typing import Dict, List, Tuple, Optional, Union, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any
+
+try:
+    from .page_pool import PagePool
+    from .page_ready import PageReadiness
+    from .screenshot_cache import ScreenshotCache
+    from .single_flight import SingleFlight
+    from .name_index import NameIndex
+    from .session_store import SessionStore
+    from .disk_cache import DiskCache
+    from .content_store import ContentStore
+    from .stats_extractor import EXTRACT_STATS_SCRIPT, ELEMENT_TEXT_SCRIPT, text_fingerprint, build_team_data, has_stats
+except ImportError:
+    from page_pool import PagePool
+    from page_ready import PageReadiness
+    from screenshot_cache import ScreenshotCache
+    from single_flight import SingleFlight
+    from name_index import NameIndex
+    from session_store import SessionStore
+    from disk_cache import DiskCache
+    from content_store import ContentStore
+    from stats_extractor import EXTRACT_STATS_SCRIPT, ELEMENT_TEXT_SCRIPT, text_fingerprint, build_team_data, has_stats
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('team_search')
 
-# 用户代理列表，用于反爬虫
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Safari/605.1.15',
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36',
-]
-
 class TeamSearcher:
     """CS:GO 战队数据查询类"""
     
-    def __init__(self):
+    def __init__(self, page_pool: Optional[PagePool] = None,
+                 readiness: Optional[PageReadiness] = None,
+                 screenshot_cache: Optional[ScreenshotCache] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 sessions: Optional[SessionStore] = None,
+                 disk_cache: Optional[DiskCache] = None,
+                 content_store: Optional[ContentStore] = None):
         """初始化查询器"""
+        # 共享的页面池，未传入时使用独立的页面池
+        self.page_pool = page_pool or PagePool()
+        # 页面就绪等待策略
+        self.readiness = readiness or PageReadiness()
+        # 截图缓存
+        self.screenshot_cache = screenshot_cache or ScreenshotCache()
+        # 合并并发的相同抓取
+        self.single_flight = single_flight or SingleFlight()
+        # 插件重载后仍然有效的截图和数据缓存
+        self.disk_cache = disk_cache or DiskCache(os.path.join(os.path.dirname(__file__), "cache"))
+        
         self.screenshot_dir = os.path.join(os.path.dirname(__file__), "screenshots")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir, exist_ok=True)
+        # 截图按内容哈希命名，内容相同的截图只保留一份
+        self.content_store = content_store or ContentStore(self.screenshot_dir)
             
-        # 存储用户搜索结果
-        self.search_results = {}
-        self.search_timestamps = {}
+        # 存储用户搜索结果，过期后自动清理
+        self.sessions = sessions if sessions is not None else SessionStore()
         self.result_timeout = 30  # 结果有效期（秒）
         
         # 加载战队数据
         self.teams_file = os.path.join(os.path.dirname(__file__), "teams.txt")
         self.ensure_teams_file_exists()
+        # 战队数据只解析一次，文件变化后在后台重新加载
+        self.team_index = NameIndex(self.teams_file, self.parse_team_file,
+                                    lambda team_name, team_info: team_name, label="战队",
+                                    match_no_space=True)
     
     def ensure_teams_file_exists(self):
         """确保teams.txt文件存在"""
@@ -51,28 +84,33 @@ class TeamSearcher:
                 f.write("11291|Meta4Pro|https://hltv.org/stats/teams/11291/meta4pro\n")
             logger.info("已创建示例teams.txt文件")
     
-    async def load_team_data(self) -> Dict[str, Tuple[str, str]]:
-        """从teams.txt加载战队数据"""
+    def parse_team_file(self, path: str) -> Dict[str, Tuple[str, str]]:
+        """解析teams.txt文件"""
         teams = {}
-        try:
-            with open(self.teams_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#"):  # 跳过注释行
-                        # 使用竖线分隔战队ID、名称和URL
-                        parts = line.split("|", 2)
-                        if len(parts) >= 2:
-                            team_id = parts[0].strip()
-                            team_name = parts[1].strip()
-                            team_url = parts[2].strip() if len(parts) > 2 else f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
-                            teams[team_name] = (team_id, team_url)
-            logger.info(f"成功加载 {len(teams)} 个战队数据")
-        except Exception as e:
-            logger.error(f"加载战队数据失败: {str(e)}")
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):  # 跳过注释行
+                    # 使用竖线分隔战队ID、名称和URL
+                    parts = line.split("|", 2)
+                    if len(parts) >= 2:
+                        team_id = parts[0].strip()
+                        team_name = parts[1].strip()
+                        team_url = parts[2].strip() if len(parts) > 2 else f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
+                        teams[team_name] = (team_id, team_url)
         return teams
     
+    async def load_team_data(self) -> Dict[str, Tuple[str, str]]:
+        """从内存索引获取战队数据"""
+        return await self.team_index.get()
+    
     def fuzzy_match(self, query: str, team_data: Dict[str, Tuple[str, str]]) -> List[Tuple[str, str, str, float]]:
         """模糊匹配战队名称"""
+        # 索引快照使用三元组倒排索引，只对候选计算相似度
+        fuzzy = getattr(team_data, "fuzzy", None)
+        if fuzzy is not None:
+            return [(entry.key, entry.value[0], entry.value[1], score) for entry, score in fuzzy.search(query)]
+        
         results = []
         query = query.lower()
         
@@ -124,9 +162,8 @@ class TeamSearcher:
         if not matches:
             return {"message": f"未找到与 '{team_name}' 相关的战队"}
         
-        # 保存搜索结果和时间戳
-        self.search_results[user_id] = matches
-        self.search_timestamps[user_id] = time.time()
+        # 保存搜索结果
+        self.sessions.set("team_search", user_id, matches, ttl=self.result_timeout)
         
         # 格式化搜索结果
         result_message = "🔍 搜索结果：\n" + "═" * 30 + "\n\n"
@@ -147,32 +184,21 @@ class TeamSearcher:
             logger.warning(f"命令格式错误: {message}")
             return {"message": "命令格式错误，正确格式为：战队[数字]"}
         
-        # 检查是否有最近的搜索结果
-        if user_id not in self.search_results or user_id not in self.search_timestamps:
-            logger.warning(f"用户 {user_id} 未找到搜索结果或时间戳")
-            return {"message": "请先使用 /搜索战队 命令查询战队"}
-        
-        # 检查结果是否过期
-        current_time = time.time()
-        last_search_time = self.search_timestamps[user_id]
-        elapsed_time = current_time - last_search_time
-        logger.debug(f"用户 {user_id} 搜索结果时间: {last_search_time}, 当前时间: {current_time}, 经过时间: {elapsed_time}秒")
-        
-        if elapsed_time > self.result_timeout:
-            logger.info(f"用户 {user_id} 的搜索结果已过期 ({elapsed_time}秒 > {self.result_timeout}秒), 清理数据")
-            del self.search_results[user_id]
-            del self.search_timestamps[user_id]
-            return {"message": f"搜索结果已过期，请重新搜索"}
+        # 检查是否有最近的搜索结果，过期的结果已被会话存储清理
+        matches = self.sessions.get("team_search", user_id)
+        if matches is None:
+            logger.warning(f"用户 {user_id} 没有有效的搜索结果")
+            return {"message": f"没有有效的搜索结果，请先使用 /搜索战队 命令查询战队（结果{self.result_timeout}秒内有效）"}
         
         try:
             index = int(match.group(1))
             logger.debug(f"解析的索引号: {index}")
             
-            if index < 1 or index > len(self.search_results[user_id]):
-                logger.warning(f"索引超出范围: {index}, 可用范围: 1-{len(self.search_results[user_id])}")
-                return {"message": f"请输入1到{len(self.search_results[user_id])}之间的数字"}
+            if index < 1 or index > len(matches):
+                logger.warning(f"索引超出范围: {index}, 可用范围: 1-{len(matches)}")
+                return {"message": f"请输入1到{len(matches)}之间的数字"}
             
-            team_name, team_id, team_url, _ = self.search_results[user_id][index - 1]
+            team_name, team_id, team_url, _ = matches[index - 1]
             logger.info(f"用户 {user_id} 选择了索引 {index}: team_id={team_id}, team_name={team_name}, team_url={team_url}")
             
             return {
@@ -190,28 +216,41 @@ class TeamSearcher:
             logger.error(f"view_team_cmd 处理过程中出错: {str(e)}", exc_info=True)
             return {"message": f"处理请求时出错: {str(e)}"}
     
-    async def get_team_stats(self, team_id: str, team_name: str) -> Optional[str]:
-        """获取战队统计数据并截图"""
+    async def get_team_stats(self, team_id: str, team_name: str, admit: Optional[Callable] = None) -> Optional[str]:
+        """获取战队统计数据并截图，admit用于包装实时抓取"""
         logger.info(f"开始获取战队 {team_name}(ID:{team_id}) 的统计数据")
         
+        # 缓存中有仍然有效的截图时直接返回，无需打开浏览器
+        cached_path = self.screenshot_cache.get("team", team_id)
+        if cached_path:
+            logger.info(f"命中截图缓存: {cached_path}")
+            return cached_path
+        
+        # 插件重载后从磁盘缓存恢复截图
+        target = os.path.join(self.screenshot_dir, f"team_stats_{team_id}_{int(time.time())}.png")
+        restored = await self.disk_cache.restore_file("team", str(team_id), target)
+        if restored:
+            path = await self.content_store.adopt(restored["path"], f"team_{team_id}")
+            logger.info(f"命中磁盘缓存: {path}")
+            self.screenshot_cache.put("team", team_id, path, created=restored["created"])
+            return path
+        
+        # 同一战队的并发查询合并为一次抓取，只有发起抓取的调用方占用准入名额
+        url = f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
+        key = SingleFlight.make_key(url, target=".team-detail-container")
+        capture = lambda: self._capture_team_stats(team_id, team_name)
+        return await self.single_flight.do(key, (lambda: admit(capture)) if admit else capture)
+    
+    async def _capture_team_stats(self, team_id: str, team_name: str) -> Optional[str]:
+        """打开战队页面并截图"""
         try:
-            # 导入playwright，确保已安装
-            from playwright.async_api import async_playwright
+            # 确保浏览器池已启动，未安装playwright时会抛出ImportError
+            await self.page_pool.start()
             
             # 生成截图文件路径
             screenshot_path = os.path.join(self.screenshot_dir, f"team_stats_{team_id}_{int(time.time())}.png")
             logger.debug(f"截图保存路径: {screenshot_path}")
             
-            # 配置浏览器启动参数
-            browser_args = [
-                '--disable-web-security',
-                '--disable-features=IsolateOrigins,site-per-process',
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-            ]
-            logger.debug(f"浏览器启动参数: {browser_args}")
-            
             # 重试机制
             max_retries = 3
             retry_delay = 2
@@ -221,59 +260,14 @@ class TeamSearcher:
                 try:
                     logger.info(f"第 {attempt + 1}/{max_retries} 次尝试获取战队数据")
                     
-                    async with async_playwright() as p:
-                        # 随机选择一个用户代理
-                        user_agent = random.choice(USER_AGENTS)
-                        logger.debug(f"使用的User-Agent: {user_agent}")
-                        
-                        logger.debug("启动浏览器...")
-                        browser = await p.chromium.launch(
-                            headless=True,
-                            args=browser_args
-                        )
-                        
-                        logger.debug("创建浏览器上下文...")
-                        context = await browser.new_context(
-                            viewport={'width': 1920, 'height': 1080},
-                            user_agent=user_agent,
-                            ignore_https_errors=True,
-                            accept_downloads=True,
-                            java_script_enabled=True,
-                            bypass_csp=True,
-                            extra_http_headers={
-                                'Accept': '*/*',
-                                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                                'Accept-Encoding': 'gzip, deflate, br',
-                                'Connection': 'keep-alive',
-                            }
-                        )
-                        
-                        logger.debug("创建新页面...")
-                        page = await context.new_page()
-                        
-                        # 添加反爬虫脚本
-                        logger.debug("添加反爬虫脚本...")
-                        await page.add_init_script("""
-                            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                            window.localStorage.setItem('CookieConsent', JSON.stringify({
-                                accepted: true,
-                                necessary: true,
-                                preferences: true,
-                                statistics: true,
-                                marketing: true
-                            }));
-                        """)
-                        
-                        # 设置超时
-                        page.set_default_timeout(60000)
-                        
+                    logger.debug("从页面池获取预热页面...")
+                    async with self.page_pool.page("team") as page:
                         # 访问页面
                         url = f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
                         logger.info(f"第 {attempt + 1} 次尝试访问URL: {url}")
                         
-                        # 延迟
-                        await asyncio.sleep(random.uniform(1.0, 2.0))
-                        logger.debug(f"延迟后开始导航...")
+                        # 可选的反爬虫随机延迟，默认关闭
+                        await self.readiness.jitter.pause()
                         
                         response = await page.goto(url, wait_until="domcontentloaded")
                         
@@ -282,10 +276,22 @@ class TeamSearcher:
                             logger.info(f"页面响应状态码: {response.status}")
                             
                             if response.status == 200:
-                                # 等待页面加载
-                                logger.debug("等待页面加载完成...")
-                                await page.wait_for_load_state("networkidle")
-                                await asyncio.sleep(random.uniform(1.0, 2.0))
+                                # 等待战队数据区域渲染完成
+                                logger.debug("等待战队数据区域加载...")
+                                fingerprint = None
+                                if await self.readiness.wait_for_selector(page, '.team-detail-container.flex-vertical'):
+                                    await self.readiness.wait_for_dom_stable(page, '.team-detail-container')
+                                    
+                                    # 数据文字与上次截图时相同则复用上次的截图，跳过等待图片、截图和编码
+                                    fingerprint = text_fingerprint(await page.evaluate(ELEMENT_TEXT_SCRIPT, '.team-detail-container'))
+                                    reused = self.screenshot_cache.revalidate("team", team_id, fingerprint)
+                                    if reused:
+                                        logger.info(f"{team_name} 的数据没有变化，复用上次的截图: {reused}")
+                                        await self.disk_cache.put_file("team", str(team_id), reused,
+                                                                       ttl=self.screenshot_cache.ttl_for("team"))
+                                        return reused
+                                    
+                                    await self.readiness.wait_for_images(page, '.team-detail-container')
                                 
                                 # 隐藏页面顶部元素
                                 logger.debug("隐藏顶部元素(header-box和sub-header)...")
@@ -317,8 +323,8 @@ class TeamSearcher:
                                 """)
                                 logger.debug("页面顶部和底部元素已隐藏")
                                 
-                                # 强制等待一下，确保样式应用
-                                await asyncio.sleep(0.5)
+                                # 等待下一帧绘制，确保样式应用
+                                await self.readiness.wait_for_paint(page)
                                 
                                 # 检查数据是否实际加载
                                 logger.debug("检查数据是否已加载...")
@@ -341,6 +347,10 @@ class TeamSearcher:
                                         logger.debug(f"截图文件大小: {file_size} 字节")
                                         if file_size > 0:
                                             logger.info("截图成功完成")
+                                            screenshot_path = await self.content_store.adopt(screenshot_path, f"team_{team_id}")
+                                            self.screenshot_cache.put("team", team_id, screenshot_path, fingerprint=fingerprint)
+                                            await self.disk_cache.put_file("team", str(team_id), screenshot_path,
+                                                                           ttl=self.screenshot_cache.ttl_for("team"))
                                             return screenshot_path
                                         else:
                                             logger.warning(f"截图文件大小为零: {screenshot_path}")
@@ -352,16 +362,12 @@ class TeamSearcher:
                                 logger.warning(f"页面返回非200状态码: {response.status}")
                         else:
                             logger.warning("没有收到页面响应")
-                        
-                        # 关闭浏览器
-                        logger.debug("关闭浏览器...")
-                        await browser.close()
-                        
-                        # 如果失败且不是最后一次尝试，则等待后重试
-                        if attempt < max_retries - 1:
-                            retry_time = retry_delay * (attempt + 1)
-                            logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
-                            await asyncio.sleep(retry_time)
+                    
+                    # 如果失败且不是最后一次尝试，则等待后重试
+                    if attempt < max_retries - 1:
+                        retry_time = retry_delay * (attempt + 1)
+                        logger.warning(f"第 {attempt + 1} 次尝试失败，等待 {retry_time} 秒后重试")
+                        await asyncio.sleep(retry_time)
                     
                 except Exception as e:
                     logger.error(f"第 {attempt + 1} 次尝试出错: {str(e)}", exc_info=True)
@@ -378,6 +384,57 @@ class TeamSearcher:
             logger.error(f"获取战队数据时出错: {str(e)}", exc_info=True)
             return None
     
+    async def get_team_data(self, team_id: str, team_name: str, admit: Optional[Callable] = None) -> Optional[Dict[str, Any]]:
+        """获取战队统计数据的文字版本，不截图，admit用于包装实时抓取"""
+        logger.info(f"开始提取战队 {team_name}(ID:{team_id}) 的统计数据")
+        
+        # 磁盘缓存中有仍然有效的数据时直接返回
+        cached = await self.disk_cache.get_json("team_data", str(team_id))
+        if cached:
+            logger.info(f"命中磁盘缓存: {team_name} 的文字数据")
+            return cached["value"]
+        
+        url = f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
+        key = SingleFlight.make_key(url, target=".team-detail-container", mode="data")
+        extract = lambda: self._extract_team_data(team_id, team_name)
+        return await self.single_flight.do(key, (lambda: admit(extract)) if admit else extract)
+    
+    async def _extract_team_data(self, team_id: str, team_name: str) -> Optional[Dict[str, Any]]:
+        """打开战队页面，一次evaluate提取统计数据"""
+        try:
+            await self.page_pool.start()
+            
+            async with self.page_pool.page("team") as page:
+                url = f"https://event.5eplay.com/csgo/team/csgo_tm_{team_id}"
+                await self.readiness.jitter.pause()
+                response = await page.goto(url, wait_until="domcontentloaded")
+                if not response or response.status != 200:
+                    logger.warning(f"页面响应异常: {response.status if response else '无响应'}")
+                    return None
+                
+                if not await self.readiness.wait_for_selector(page, '.team-detail-container.flex-vertical'):
+                    logger.error("未找到数据元素 .team-detail-container")
+                    return None
+                
+                # 只需等待数据渲染完成，不等待图片
+                await self.readiness.wait_for_dom_stable(page, '.team-detail-container')
+                raw = await page.evaluate(EXTRACT_STATS_SCRIPT, '.team-detail-container')
+            
+            data = build_team_data(team_id, team_name, raw)
+            if not has_stats(data):
+                logger.warning(f"未能从页面中解析出 {team_name} 的数据")
+                return None
+            logger.info(f"已提取 {team_name} 的 {len(data['stats'])} 项统计数据")
+            await self.disk_cache.put_json("team_data", str(team_id), data, ttl=self.screenshot_cache.ttl_for("team"))
+            return data
+            
+        except ImportError:
+            logger.error("未安装playwright，请使用pip install playwright安装")
+            return None
+        except Exception as e:
+            logger.error(f"提取战队数据失败: {str(e)}", exc_info=True)
+            return None
+    
     async def help_cmd(self) -> Dict[str, str]:
         """显示帮助信息"""
         help_text = "🏆 CS:GO 战队数据查询系统 🏆\n" + "═" * 30 + "\n\n"
@@ -0,0 +1,35 @@
+import os
+import sys
+import asyncio
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_index import _typo, compare_recall
+from player_search import PlayerSearcher
+from team_search import TeamSearcher
+
+
+def _report(searcher, loader: str, count: int):
+    """用带拼写错误的真实名称比较索引和逐条比较的结果"""
+    snapshot = asyncio.run(getattr(searcher, loader)())
+    plain = dict(snapshot)
+    rng = random.Random(5)
+    names = [entry.name for entry in rng.sample(snapshot.entries, min(count, len(snapshot.entries)))]
+    queries = [_typo(name.lower(), rng) for name in names]
+    return compare_recall(lambda q: searcher.fuzzy_match(q, plain),
+                          lambda q: searcher.fuzzy_match(q, snapshot), queries)
+
+
+def test_player_index_matches_linear_scan():
+    """选手索引的前10个结果与逐条比较完全一致"""
+    report = _report(PlayerSearcher(), "load_player_data", 60)
+    assert report["recall"] >= 0.99
+    assert report["identical"] == 1.0
+
+
+def test_team_index_matches_linear_scan():
+    """战队索引的前10个结果与逐条比较完全一致"""
+    report = _report(TeamSearcher(), "load_team_data", 20)
+    assert report["recall"] >= 0.99
+    assert report["identical"] == 1.0
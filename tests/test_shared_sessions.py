@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SessionStore
+from player_search import PlayerSearcher
+from team_search import TeamSearcher
+from match_result import MatchResultFetcher
+
+
+def test_fetchers_share_the_store_passed_in():
+    """空的会话存储也不能被替换为各自私有的存储"""
+    sessions = SessionStore()
+    assert len(sessions) == 0
+    for fetcher in (PlayerSearcher(sessions=sessions), TeamSearcher(sessions=sessions),
+                    MatchResultFetcher(sessions=sessions)):
+        assert fetcher.sessions is sessions
+
+
+def test_entries_written_by_fetchers_are_visible_in_shared_store():
+    """查询器写入的会话在共享存储中可见"""
+    sessions = SessionStore()
+    fetcher = MatchResultFetcher(sessions=sessions)
+    fetcher.sessions.set("match_user", "u1", "session_1", ttl=30)
+    assert sessions.get("match_user", "u1") == "session_1"
+    assert sessions.stats()["entries"] == 1
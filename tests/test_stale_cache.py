@@ -0,0 +1,57 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionScheduler
+from stale_cache import StaleCache
+
+
+def test_concurrent_misses_are_admitted_once():
+    """同一个键并发未命中时只有一个请求经过准入调度"""
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        cache = StaleCache(scheduler=scheduler)
+        fetches = []
+
+        async def fetch():
+            fetches.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        async def admit(fn):
+            return await scheduler.run(scheduler.enter("g", "u"), fn)
+
+        results = await asyncio.gather(*[cache.get("k", fetch, admit=admit) for _ in range(5)])
+        assert [value for value, _ in results] == ["value"] * 5
+        assert len(fetches) == 1
+        assert scheduler.stats()["admitted"] == 1
+
+    asyncio.run(run())
+
+
+def test_background_refresh_does_not_use_interactive_admission():
+    """软过期后的后台刷新不经过用户请求的准入包装，单并发时也不会卡住"""
+    async def run():
+        scheduler = AdmissionScheduler(max_concurrent=1)
+        cache = StaleCache(soft_ttl=0, hard_ttl=60, scheduler=scheduler)
+        cache.put("k", "old")
+        admitted = []
+
+        async def fetch():
+            return "new"
+
+        async def admit(fn):
+            admitted.append(1)
+            return await scheduler.run(scheduler.enter("g", "u"), fn)
+
+        value, _ = await cache.get("k", fetch, admit=admit)
+        assert value == "old"
+        await asyncio.wait_for(asyncio.gather(*cache._tasks), timeout=1)
+        assert cache.peek("k")[0] == "new"
+        assert not admitted
+        stats = scheduler.stats()
+        assert stats["running"] == 0 and stats["running_background"] == 0
+
+    asyncio.run(run())